@@ -0,0 +1,21 @@
+import hmac
+from django.conf import settings
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+
+
+class IsAdminOrReadOnly(BasePermission):
+    """
+    Reads are public; writes that change what the service trains or serves
+    need a staff user or `Authorization: Bearer <ADMIN_API_TOKEN>`.
+    Without ADMIN_API_TOKEN only staff users can write.
+    """
+
+    def has_permission(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        if request.user and request.user.is_staff:
+            return True
+        token = getattr(settings, "ADMIN_API_TOKEN", None)
+        if not token:
+            return False
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
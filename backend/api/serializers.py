@@ -13,7 +13,40 @@ class PredictionInputSerializer(serializers.Serializer):
     SMS_received = serializers.IntegerField()
     Age = serializers.IntegerField()
 
+class ExplanationSerializer(serializers.Serializer):
+    base_value = serializers.FloatField()
+    units = serializers.ChoiceField(choices=['probability', 'log_odds', 'decision_function'])
+    contributions = serializers.DictField(child=serializers.FloatField())
+
 class PredictionOutputSerializer(serializers.Serializer):
     will_show = serializers.BooleanField()
     probability = serializers.FloatField()
     probability_percentage = serializers.FloatField()
+    explanation = ExplanationSerializer(required=False)
+
+class ScheduleForecastInputSerializer(serializers.Serializer):
+    appointments = PredictionInputSerializer(many=True, allow_empty=False)
+    confidence = serializers.FloatField(default=0.95, min_value=0.5, max_value=0.999)
+
+class ForecastGroupSerializer(serializers.Serializer):
+    appointments = serializers.IntegerField()
+    expected_no_shows = serializers.FloatField()
+    variance = serializers.FloatField()
+    ci_low = serializers.FloatField()
+    ci_high = serializers.FloatField()
+    expected_no_show_rate = serializers.FloatField()
+
+class NeighbourhoodForecastSerializer(ForecastGroupSerializer):
+    Neighbourhood = serializers.CharField()
+
+class DayOfWeekForecastSerializer(ForecastGroupSerializer):
+    day_of_week = serializers.CharField()
+
+class DateForecastSerializer(ForecastGroupSerializer):
+    date = serializers.DateField()
+
+class ScheduleForecastOutputSerializer(ForecastGroupSerializer):
+    confidence = serializers.FloatField()
+    by_neighbourhood = NeighbourhoodForecastSerializer(many=True)
+    by_day_of_week = DayOfWeekForecastSerializer(many=True)
+    by_date = DateForecastSerializer(many=True)
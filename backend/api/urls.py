@@ -1,10 +1,17 @@
 from django.urls import path
-from .views import TrainStatusView, ModelMetricsView, ConfusionMatrixView, CleanedDataView, PredictView
+from .views import TrainStatusView, ModelMetricsView, ConfusionMatrixView, CleanedDataView, PredictView, DriftView, ScheduleForecastView, ModelVersionsView, SegmentsView, LivenessView, ReadinessView, ShadowView
 
 urlpatterns = [
+    path('health/live/', LivenessView.as_view(), name='health-live'),
+    path('health/ready/', ReadinessView.as_view(), name='health-ready'),
     path('train-status/', TrainStatusView.as_view(), name='train-status'),
     path('model-metrics/', ModelMetricsView.as_view(), name='model-metrics'),
     path('confusion-matrix/', ConfusionMatrixView.as_view(), name='confusion-matrix'),
     path('cleaned-data/', CleanedDataView.as_view(), name='cleaned-data'),
     path('predict/', PredictView.as_view(), name='predict'),
+    path('drift/', DriftView.as_view(), name='drift'),
+    path('forecast/', ScheduleForecastView.as_view(), name='forecast'),
+    path('models/', ModelVersionsView.as_view(), name='models'),
+    path('segments/', SegmentsView.as_view(), name='segments'),
+    path('shadow/', ShadowView.as_view(), name='shadow'),
 ]
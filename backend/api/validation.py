@@ -0,0 +1,195 @@
+"""
+Fast-path request validation for the prediction endpoints.
+
+DRF serializers build and run a chain of field objects per request, and
+DateTimeField parses through several Python layers; for a small model that
+costs more than inference. Here the serializer declarations are compiled once
+into plain per-field checks that accept exactly the values DRF would accept
+unchanged (ints, valid choices, clean strings, ISO-8601 datetimes via
+`datetime.fromisoformat`, which is what Django's `parse_datetime` tries
+first) and produce the same validated values.
+
+Anything the fast path does not accept outright is re-validated by the
+original serializer, so error responses (messages, structure, codes) are
+DRF's own by construction. The serializers stay the source of truth for the
+OpenAPI schema.
+"""
+import datetime
+import re
+import pandas as pd
+from django.conf import settings
+from django.core.validators import ProhibitNullCharactersValidator
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.validators import ProhibitSurrogateCharactersValidator
+from rest_framework.settings import api_settings, ISO_8601
+from .serializers import PredictionInputSerializer, ScheduleForecastInputSerializer
+
+_INVALID_CHARS = re.compile('[\x00\ud800-\udfff]')  # CharField rejects null and surrogate characters
+_MISSING = object()
+
+
+def _check_int(value, tz):
+    if type(value) is int:
+        return value
+    return _MISSING
+
+
+def _check_char(value, tz):
+    # Non-blank, already stripped (trim_whitespace), no prohibited characters
+    if type(value) is str and value and not value[0].isspace() and not value[-1].isspace() \
+            and _INVALID_CHARS.search(value) is None:
+        return value
+    return _MISSING
+
+
+def _check_datetime(value, tz):
+    if type(value) is not str:
+        return _MISSING
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return _MISSING
+    if parsed.tzinfo is not None:
+        try:
+            return parsed.astimezone(tz)
+        except OverflowError:
+            return _MISSING
+    if tz is None or not _is_fixed_offset(tz):
+        # Naive datetimes in DST zones need DRF's make_aware validity check
+        return _MISSING
+    return parsed.replace(tzinfo=tz)
+
+
+def _is_fixed_offset(tz):
+    return isinstance(tz, datetime.timezone) or str(tz) in ('UTC', 'Etc/UTC')
+
+
+def _choice_checker(field):
+    choices = dict(field.choice_strings_to_values)
+
+    def check(value, tz):
+        if type(value) is str:
+            return choices.get(value, _MISSING)
+        return _MISSING
+    return check
+
+
+_CHAR_VALIDATORS = (ProhibitNullCharactersValidator, ProhibitSurrogateCharactersValidator)
+
+
+def _compile(serializer_class):
+    """(field name, check) pairs in declaration order, or None if a field has no fast path."""
+    schema = []
+    for name, field in serializer_class().fields.items():
+        if field.read_only or not field.required or field.allow_null or field.source != name:
+            return None
+        # Extra validators (min/max, custom) are not replicated; the built-in CharField ones are
+        if not all(isinstance(v, _CHAR_VALIDATORS) for v in field.validators):
+            return None
+        if isinstance(field, serializers.ChoiceField):
+            check = _choice_checker(field) if not field.allow_blank else None
+        elif isinstance(field, serializers.DateTimeField):
+            input_formats = getattr(field, 'input_formats', api_settings.DATETIME_INPUT_FORMATS)
+            check = _check_datetime if list(input_formats) == [ISO_8601] else None
+        elif isinstance(field, serializers.IntegerField):
+            check = _check_int
+        elif isinstance(field, serializers.CharField):
+            check = _check_char if not field.allow_blank and field.trim_whitespace else None
+        else:
+            check = None
+        if check is None:
+            return None
+        schema.append((name, check))
+    return schema
+
+
+PREDICTION_SCHEMA = _compile(PredictionInputSerializer)
+
+
+def _field_timezone():
+    # DateTimeField.default_timezone(), resolved once per request
+    return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+def _fast_record(data, tz):
+    """Validated dict, or None if any field needs the full serializer."""
+    if PREDICTION_SCHEMA is None or type(data) is not dict:
+        return None
+    validated = {}
+    for name, check in PREDICTION_SCHEMA:
+        value = check(data.get(name, _MISSING), tz)
+        if value is _MISSING:
+            return None
+        validated[name] = value
+    return validated
+
+
+def validate_prediction(data):
+    """
+    Validate one /api/predict/ payload.
+    Returns (validated_data, None) or (None, errors) exactly like
+    PredictionInputSerializer.is_valid() / .validated_data / .errors.
+    """
+    validated = _fast_record(data, _field_timezone())
+    if validated is not None:
+        return validated, None
+    serializer = PredictionInputSerializer(data=data)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, serializer.errors
+
+
+_FORECAST_FIELDS = ScheduleForecastInputSerializer().fields
+
+
+def _fast_confidence(data):
+    field = _FORECAST_FIELDS['confidence']
+    value = data.get('confidence', _MISSING)
+    if value is _MISSING:
+        return field.get_default()
+    if type(value) in (int, float) and field.min_value <= value <= field.max_value:
+        return float(value)
+    return _MISSING
+
+
+def _fast_batch(items, tz):
+    """
+    Column-wise validation of a list of appointments. Returns a DataFrame with
+    one column per schema field, or None if any value needs the full serializer.
+    """
+    if PREDICTION_SCHEMA is None or not all(type(item) is dict for item in items):
+        return None
+    columns = {}
+    for name, check in PREDICTION_SCHEMA:
+        raw = [item.get(name, _MISSING) for item in items]
+        if check is _check_int:
+            # The common all-int column needs no per-value call
+            if not all(type(v) is int for v in raw):
+                return None
+            values = raw
+        else:
+            values = [check(v, tz) for v in raw]
+            if any(v is _MISSING for v in values):
+                return None
+        columns[name] = values
+    return pd.DataFrame(columns)
+
+
+def validate_forecast(data):
+    """
+    Validate a /api/forecast/ payload. On success `appointments` is a
+    DataFrame (what forecast_schedule works on) instead of a list of dicts.
+    Returns (validated_data, None) or (None, errors) like
+    ScheduleForecastInputSerializer.
+    """
+    if type(data) is dict and type(data.get('appointments')) is list and data['appointments']:
+        confidence = _fast_confidence(data)
+        if confidence is not _MISSING:
+            appointments = _fast_batch(data['appointments'], _field_timezone())
+            if appointments is not None:
+                return {'appointments': appointments, 'confidence': confidence}, None
+    serializer = ScheduleForecastInputSerializer(data=data)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, serializer.errors
@@ -1,14 +1,37 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from drf_spectacular.utils import extend_schema
 from db.mongo import get_collection
-from ml.predictor import AppointmentPredictor
-from .serializers import PredictionInputSerializer, PredictionOutputSerializer
+from ml.predictor import get_predictor
+from ml.forecast import forecast_schedule
+from ml import model_registry
+from ml.shadow import persisted_comparisons
+from .serializers import (
+    PredictionInputSerializer, PredictionOutputSerializer,
+    ScheduleForecastInputSerializer, ScheduleForecastOutputSerializer,
+)
+from .validation import validate_prediction, validate_forecast
+from .permissions import IsAdminOrReadOnly
 
-# Global predictor instance to load model once
-_predictor = AppointmentPredictor()
+class LivenessView(APIView):
+    def get(self, request):
+        # The process is up and serving HTTP; says nothing about the model
+        return Response({"status": "alive"})
+
+class ReadinessView(APIView):
+    def get(self, request):
+        # 200 only once a model is loaded and warmed up (load balancers route traffic on this)
+        predictor = get_predictor()
+        readiness = predictor.status()
+        if readiness["ready"]:
+            return Response({"status": "ready", **readiness})
+        return Response({"status": "not_ready", **readiness}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 class TrainStatusView(APIView):
+    # Anyone can read the status; starting a retrain needs an admin
+    permission_classes = [IsAdminOrReadOnly]
+
     def get(self, request):
         status_col = get_collection("pipeline_status")
         status_doc = status_col.find_one({"_id": "current_status"})
@@ -18,8 +41,11 @@ class TrainStatusView(APIView):
         return Response({"status": "UNKNOWN"})
 
     def post(self, request):
-        # Trigger training manually? Optional.
-        return Response({"message": "Training is triggered automatically on startup."}, status=status.HTTP_200_OK)
+        # Trigger a retrain in the background (also runs automatically on startup)
+        from core.startup import start_pipeline
+        if start_pipeline():
+            return Response({"message": "Training started."}, status=status.HTTP_202_ACCEPTED)
+        return Response({"message": "Training is already running."}, status=status.HTTP_409_CONFLICT)
 
 class ModelMetricsView(APIView):
     def get(self, request):
@@ -54,21 +80,144 @@ class CleanedDataView(APIView):
             if "_id" in d: d.pop("_id")
         return Response(data)
 
+class DriftView(APIView):
+    def get(self, request):
+        # Live feature / score drift against the training reference, over all workers' traffic
+        # (counts flushed every DRIFT_FLUSH_SECONDS); this worker's alone if Mongo can't be read
+        predictor = get_predictor()
+        monitor = predictor.drift_monitor
+        if monitor is None:
+            return Response({"error": "No drift reference available"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            return Response({"scope": "all_workers", **monitor.combined_report()})
+        except Exception as e:
+            return Response({"scope": "worker", "error": str(e), **monitor.report()})
+
+class ModelVersionsView(APIView):
+    # Anyone can list versions; activating one needs an admin
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request):
+        predictor = get_predictor()
+        return Response({
+            "current": model_registry.get_current_version(),
+            "loaded": predictor.model_version,
+            "versions": model_registry.list_versions(),
+        })
+
+    def post(self, request):
+        # Promote / roll back to an existing version without copying any files
+        version = request.data.get("version")
+        if not version:
+            return Response({"error": "version is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            model_registry.activate(version)
+        except KeyError as e:
+            return Response({"error": e.args[0]}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            # e.g. a segment version, which has no scaler / encoder of its own
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # This worker warms the version up in the background; the others follow within MODEL_WATCH_SECONDS.
+        # Poll GET until "loaded" matches "current".
+        predictor = get_predictor()
+        predictor.reload_in_background()
+        return Response({"current": version, "loaded": predictor.model_version}, status=status.HTTP_202_ACCEPTED)
+
+class SegmentsView(APIView):
+    def get(self, request):
+        # Segment models served by this worker and its model cache (load latency, evictions)
+        predictor = get_predictor()
+        cache = predictor.segment_cache
+        if cache is None:
+            return Response({"segments": {}, "cache": None})
+        return Response({"segments": cache.segments, "cache": cache.stats()})
+
+class ShadowView(APIView):
+    # Anyone can read the comparison; changing the challengers needs an admin
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request):
+        # Champion vs challenger agreement and P(show) deltas: this worker's queue and
+        # counters, plus the totals over all workers from shadow_evaluation
+        predictor = get_predictor()
+        shadow = predictor.shadow
+        if shadow is None:
+            return Response({"enabled": False, "champion_version": predictor.model_version})
+        try:
+            all_workers = persisted_comparisons(shadow.champion_version)
+        except Exception as e:
+            all_workers = {"error": str(e)}
+        return Response({"enabled": True, "worker": shadow.report(), "all_workers": all_workers})
+
+    def post(self, request):
+        # {"versions": ["<version>", ...]} sets this worker's challengers; null goes back to settings
+        versions = request.data.get("versions")
+        if versions is not None and (not isinstance(versions, list) or not all(isinstance(v, str) for v in versions)):
+            return Response({"error": "'versions' must be a list of model versions or null"}, status=status.HTTP_400_BAD_REQUEST)
+        for version in versions or []:
+            if version == "latest":
+                continue
+            try:
+                model_registry.check_servable(version)
+            except KeyError as e:
+                return Response({"error": e.args[0]}, status=status.HTTP_404_NOT_FOUND)
+            except ValueError as e:
+                # e.g. a segment version, which has no scaler / encoder of its own
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # The challengers are loaded in the background; poll GET until worker.challengers reflects "requested"
+        predictor = get_predictor()
+        predictor.set_challengers_in_background(versions)
+        shadow = predictor.shadow
+        return Response(
+            {"requested": versions, "challengers": sorted(shadow.challengers) if shadow else []},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
 class PredictView(APIView):
+    # Input is validated by the fast path in validation.py; the serializers document the schema
+    @extend_schema(request=PredictionInputSerializer, responses=PredictionOutputSerializer)
     def post(self, request):
-        if not _predictor.ready:
+        predictor = get_predictor()
+        if not predictor.ready:
              return Response(
                  {"error": "Model not ready. Backend is potentially retraining or failed to connect to DB."},
                  status=status.HTTP_503_SERVICE_UNAVAILABLE
              )
 
-        serializer = PredictionInputSerializer(data=request.data)
-        if serializer.is_valid():
-            prediction = _predictor.predict(serializer.validated_data)
+        validated_data, errors = validate_prediction(request.data)
+        if errors is None:
+            # ?explain=true adds per-feature contributions to the response
+            explain = request.query_params.get("explain", "").lower() in ("1", "true", "yes")
+            prediction = predictor.predict(validated_data, explain=explain)
             if "error" in prediction:
                return Response(prediction, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
             output_serializer = PredictionOutputSerializer(prediction)
             return Response(output_serializer.data)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+class ScheduleForecastView(APIView):
+    @extend_schema(request=ScheduleForecastInputSerializer, responses=ScheduleForecastOutputSerializer)
+    def post(self, request):
+        # Expected no-shows for a whole day's / week's schedule, scored in one batch
+        predictor = get_predictor()
+        if not predictor.ready:
+             return Response(
+                 {"error": "Model not ready. Backend is potentially retraining or failed to connect to DB."},
+                 status=status.HTTP_503_SERVICE_UNAVAILABLE
+             )
+
+        validated_data, errors = validate_forecast(request.data)
+        if errors is None:
+            try:
+                forecast = forecast_schedule(
+                    predictor,
+                    validated_data["appointments"],
+                    confidence=validated_data["confidence"],
+                )
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response(ScheduleForecastOutputSerializer(forecast).data)
+
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,69 @@
+"""
+Compare two benchmark result files produced by benchmarks/run.py.
+
+Usage (from backend/):
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 if any stage or predictor batch got slower than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def _pipeline_index(results):
+    index = {}
+    for run in results.get('pipeline', []):
+        for st in run['stages']:
+            index[(run['rows'], st['name'])] = st
+    return index
+
+
+def _predictor_index(results):
+    index = {}
+    for run in results.get('predictor', []):
+        for batch in run['batches']:
+            index[(run['trained_on_rows'], batch['name'], batch['batch_size'])] = batch
+    return index
+
+
+def compare(baseline, candidate, threshold):
+    rows = []
+    base, cand = _pipeline_index(baseline), _pipeline_index(candidate)
+    for key in sorted(base.keys() & cand.keys(), key=str):
+        for metric in ('wall_seconds', 'peak_rss_mb'):
+            rows.append((f"pipeline rows={key[0]} {key[1]}", metric, base[key][metric], cand[key][metric]))
+    base, cand = _predictor_index(baseline), _predictor_index(candidate)
+    for key in sorted(base.keys() & cand.keys(), key=str):
+        rows.append((f"predictor rows={key[0]} {key[1]}[{key[2]}]", 'median_ms', base[key]['median_ms'], cand[key]['median_ms']))
+
+    regressions = []
+    for label, metric, old, new in rows:
+        change = (new - old) / old if old else 0.0
+        flag = ''
+        if change > threshold:
+            flag = 'REGRESSION'
+            regressions.append(label)
+        print(f"{label:<60} {metric:<13} {old:>12.4f} -> {new:>12.4f} ({change:+.1%}) {flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
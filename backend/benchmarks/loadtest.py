@@ -0,0 +1,334 @@
+"""
+HTTP load generator for /api/predict/.
+
+By default it starts a local server on the in-memory Mongo stand-in, trains an
+initial model on synthetic data, then replays synthetic payloads:
+
+  * open loop  (--mode open):   requests arrive at a fixed --rate regardless of
+                                how fast the server answers; latency is measured
+                                from the scheduled send time, so queueing delay
+                                is not hidden (no coordinated omission).
+  * closed loop (--mode closed): --concurrency clients each send the next request
+                                as soon as the previous one returns.
+
+--retrain-at N triggers POST /api/train-status/ N seconds into the run and the
+report splits latency into before / during / after the retrain. Retraining is
+admin-only: against --url, set ADMIN_API_TOKEN to the server's token.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --mode open --rate 50 --duration 60 --retrain-at 20
+    python -m benchmarks.loadtest --mode closed --concurrency 8 --url http://127.0.0.1:8000
+"""
+import argparse
+import http.client
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PERCENTILES = [50, 95, 99, 99.9]
+
+
+class HttpClient:
+    """Keep-alive HTTP client with one connection per thread."""
+
+    def __init__(self, base_url, timeout=30, token=None):
+        parsed = urlparse(base_url)
+        # Admin API token, sent as a Bearer header (retrain)
+        self.token = token if token is not None else os.environ.get('ADMIN_API_TOKEN')
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def request(self, method, path, body=None):
+        """Returns (status, parsed JSON or None). Status 0 means a transport error."""
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+                    self._local.conn = None
+                try:
+                    return response.status, json.loads(data) if data else None
+                except ValueError:
+                    return response.status, None
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                self._local.conn = None
+                if attempt == 1:
+                    return 0, None
+        return 0, None
+
+
+# ---- local server ---------------------------------------------------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _local_admin_token():
+    # Shared by the local server and every HttpClient of this run
+    os.environ.setdefault('ADMIN_API_TOKEN', secrets.token_hex(16))
+    return os.environ['ADMIN_API_TOKEN']
+
+
+def start_local_server(workdir, server, threads, train_rows, seed):
+    """Start a local server on the in-memory Mongo stand-in. Returns (process, base_url)."""
+    from benchmarks import synthetic
+
+    csv_path = Path(workdir) / 'appointments.csv'
+    synthetic.write_csv(csv_path, train_rows, seed=seed)
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='core.settings',
+        MONGO_BACKEND='memory',
+        MONGO_MEMORY_DISCARD='cleaned_data,engineered_dataset',
+        ADMIN_API_TOKEN=_local_admin_token(),
+        DATASET_PATH=str(csv_path),
+        MODELS_DIR=str(Path(workdir) / 'models'),
+    )
+    if server == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', 'core.wsgi:application', '--bind', f'127.0.0.1:{port}',
+               '--workers', '1', '--threads', str(threads)]
+    else:
+        cmd = [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+    log = open(Path(workdir) / 'server.log', 'wb')
+    process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+
+    client = HttpClient(base_url, timeout=5)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited early, see {Path(workdir) / 'server.log'}")
+        status, _ = client.request('GET', '/api/train-status/')
+        if status == 200:
+            return process, base_url
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Server did not come up within 60s")
+
+
+def wait_for_training(client, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status, doc = client.request('GET', '/api/train-status/')
+        if status == 200 and doc and doc.get('status') in ('COMPLETED', 'FAILED'):
+            return doc['status']
+        time.sleep(1)
+    raise RuntimeError(f"Training did not finish within {timeout}s")
+
+
+# ---- load generation ------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []  # (start offset seconds, latency seconds, status)
+
+    def add(self, start_offset, latency, status):
+        with self._lock:
+            self.samples.append((start_offset, latency, status))
+
+
+def run_open_loop(client, payloads, rate, duration, max_workers, recorder, t0):
+    """Fixed arrival rate; latency is measured from the *scheduled* send time."""
+    total = int(rate * duration)
+    interval = 1.0 / rate
+
+    def fire(i, scheduled):
+        status, _ = client.request('POST', '/api/predict/', payloads[i % len(payloads)])
+        recorder.add(scheduled - t0, time.perf_counter() - scheduled, status)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i in range(total):
+            scheduled = t0 + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, i, scheduled)
+
+
+def run_closed_loop(client, payloads, concurrency, duration, recorder, t0):
+    """Each client sends its next request as soon as the previous one returns."""
+    end = t0 + duration
+
+    def client_loop(worker_id):
+        i = worker_id
+        while time.perf_counter() < end:
+            started = time.perf_counter()
+            status, _ = client.request('POST', '/api/predict/', payloads[i % len(payloads)])
+            recorder.add(started - t0, time.perf_counter() - started, status)
+            i += concurrency
+
+    threads = [threading.Thread(target=client_loop, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def trigger_retrain(client, at_seconds, t0, events):
+    time.sleep(max(0.0, t0 + at_seconds - time.perf_counter()))
+    events['retrain_start'] = time.perf_counter() - t0
+    status, _ = client.request('POST', '/api/train-status/')
+    events['retrain_trigger_status'] = status
+    try:
+        events['retrain_result'] = wait_for_training(client, timeout=3600)
+    except RuntimeError as e:
+        events['retrain_result'] = str(e)
+    events['retrain_end'] = time.perf_counter() - t0
+
+
+# ---- reporting ------------------------------------------------------------
+
+def summarize(samples, wall_seconds):
+    if not samples:
+        return {'requests': 0}
+    latencies = np.array([s[1] for s in samples]) * 1000
+    statuses = np.array([s[2] for s in samples])
+    errors = int((statuses != 200).sum())
+    codes, counts = np.unique(statuses, return_counts=True)
+    summary = {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds > 0 else None,
+        'error_rate': round(errors / len(samples), 5),
+        'status_codes': {str(int(c)): int(n) for c, n in zip(codes, counts)},
+        'mean_ms': round(float(latencies.mean()), 3),
+        'max_ms': round(float(latencies.max()), 3),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        summary[f'p{p:g}_ms'] = round(float(value), 3)
+    return summary
+
+
+def build_report(recorder, duration, events):
+    samples = sorted(recorder.samples)
+    report = {'overall': summarize(samples, duration)}
+    if 'retrain_start' in events:
+        start = events['retrain_start']
+        end = events.get('retrain_end', duration)
+        windows = {
+            'before_retrain': [s for s in samples if s[0] < start],
+            'during_retrain': [s for s in samples if start <= s[0] < end],
+            'after_retrain': [s for s in samples if s[0] >= end],
+        }
+        bounds = {'before_retrain': (0, start), 'during_retrain': (start, min(end, duration)),
+                  'after_retrain': (end, duration)}
+        for name, window in windows.items():
+            lo, hi = bounds[name]
+            report[name] = summarize(window, max(hi - lo, 0))
+    report['events'] = {k: round(v, 3) if isinstance(v, float) else v for k, v in events.items()}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--server', default='runserver', choices=['runserver', 'gunicorn'])
+    parser.add_argument('--server-threads', type=int, default=4, help='gunicorn --threads for the single worker')
+    parser.add_argument('--train-rows', type=int, default=20_000, help='Synthetic rows for the local server model')
+    parser.add_argument('--mode', default='open', choices=['open', 'closed'])
+    parser.add_argument('--rate', type=float, default=50, help='Open loop: requests per second')
+    parser.add_argument('--max-inflight', type=int, default=256, help='Open loop: client thread pool size')
+    parser.add_argument('--concurrency', type=int, default=4, help='Closed loop: number of clients')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+    parser.add_argument('--warmup', type=int, default=20, help='Requests sent before measuring')
+    parser.add_argument('--retrain-at', type=float, help='Trigger a retrain this many seconds into the run')
+    parser.add_argument('--payloads', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from benchmarks import synthetic
+
+    payloads = synthetic.prediction_payloads(args.payloads, seed=args.seed + 1)
+    process = None
+    with tempfile.TemporaryDirectory(prefix='appt-load-') as workdir:
+        try:
+            if args.url:
+                base_url = args.url
+                client = HttpClient(base_url)
+            else:
+                print("Starting local server...", file=sys.stderr)
+                process, base_url = start_local_server(
+                    workdir, args.server, args.server_threads, args.train_rows, args.seed)
+                client = HttpClient(base_url)
+                print("Training initial model...", file=sys.stderr)
+                client.request('POST', '/api/train-status/')
+                if wait_for_training(client, timeout=3600) != 'COMPLETED':
+                    raise RuntimeError("Initial training failed")
+
+            for i in range(args.warmup):
+                client.request('POST', '/api/predict/', payloads[i % len(payloads)])
+
+            print(f"Running {args.mode}-loop load for {args.duration}s against {base_url}...", file=sys.stderr)
+            recorder = Recorder()
+            events = {}
+            t0 = time.perf_counter()
+            retrain_thread = None
+            if args.retrain_at is not None:
+                retrain_thread = threading.Thread(
+                    target=trigger_retrain, args=(HttpClient(base_url), args.retrain_at, t0, events), daemon=True)
+                retrain_thread.start()
+
+            if args.mode == 'open':
+                run_open_loop(client, payloads, args.rate, args.duration, args.max_inflight, recorder, t0)
+            else:
+                run_closed_loop(client, payloads, args.concurrency, args.duration, recorder, t0)
+            wall = time.perf_counter() - t0
+            if retrain_thread is not None and 'retrain_start' not in events:
+                events['retrain_note'] = 'run ended before the retrain was triggered'
+
+            report = {
+                'config': vars(args),
+                'target': base_url,
+                'wall_seconds': round(wall, 3),
+                **build_report(recorder, wall, events),
+            }
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
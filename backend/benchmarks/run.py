@@ -0,0 +1,199 @@
+"""
+Benchmark every training stage and the predictor on synthetic data.
+
+Runs fully offline: Mongo is replaced by the in-memory stand-in (db/memory.py,
+which only counts the cleaned_data / engineered_dataset inserts), or a local
+mongod with --mongo-backend local, and all artifacts go to a temporary MODELS_DIR, so nothing in backend/models
+is touched. Results are written as JSON for comparison across commits
+(see benchmarks/compare.py).
+
+Usage (from backend/):
+    python -m benchmarks.run --rows 100000 1000000 10000000 --output results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_ROWS = [100_000, 1_000_000, 10_000_000]
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+
+
+def _setup_django(models_dir, mongo_backend):
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ['MODELS_DIR'] = str(models_dir)
+    os.environ['MONGO_BACKEND'] = mongo_backend
+    # Bulk row-level collections are written but not kept by the in-memory stand-in;
+    # holding millions of documents would dominate (and inflate) peak_rss_mb
+    os.environ.setdefault('MONGO_MEMORY_DISCARD', 'cleaned_data,engineered_dataset')
+    # A spawned local mongod keeps its data with the other temporary artifacts
+    os.environ.setdefault('MONGO_LOCAL_DBPATH', str(Path(models_dir).parent / 'mongo'))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+    from db.mongo import ensure_indexes
+    ensure_indexes()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _environment():
+    import numpy, pandas, sklearn
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def bench_pipeline(rows, workdir, max_train_rows, seed):
+    """Time load/clean/feature engineering/training for one dataset size."""
+    from ml import profiling
+    from ml.data_loader import load_data
+    from ml.preprocessing import clean_data
+    from ml.feature_engineering import FeatureEngineer
+    from ml.training import train_models
+    from ml.training_matrix import TrainingMatrix
+    from benchmarks import synthetic
+
+    csv_path = Path(workdir) / f'appointments_{rows}.csv'
+    started = time.perf_counter()
+    synthetic.write_csv(csv_path, rows, seed=seed)
+    generate_seconds = time.perf_counter() - started
+
+    profiler = profiling.PipelineProfiler()
+    with profiling.activate(profiler):
+        with profiling.stage('load_data') as st:
+            df = load_data(csv_path)
+            st.rows_out = len(df)
+        with profiling.stage('clean_data', rows_in=len(df)) as st:
+            df = clean_data(df)
+            st.rows_out = len(df)
+        with profiling.stage('feature_engineering', rows_in=len(df)) as st:
+            fe = FeatureEngineer()
+            X, y = fe.process(df)
+            st.rows_out = len(X)
+        del df
+        if max_train_rows and len(X) > max_train_rows:
+            X = X.sample(n=max_train_rows, random_state=seed)
+            y = y.loc[X.index]
+        data = TrainingMatrix.from_frame(X, y)
+        del X, y
+        with profiling.stage('train_models', rows_in=len(data)) as st:
+            train_models(data, artifacts=fe.artifacts(), reference=(fe.reference_X, fe.reference_y))
+            st.rows_out = len(data)
+
+    csv_path.unlink()
+    report = profiler.report()
+    report['rows'] = rows
+    report['generate_seconds'] = round(generate_seconds, 4)
+    report['train_rows'] = len(data)
+    return report
+
+
+def bench_predictor(batch_sizes, repeats, seed):
+    """Latency and throughput of AppointmentPredictor at several batch sizes."""
+    from ml.predictor import AppointmentPredictor
+    from benchmarks import synthetic
+
+    predictor = AppointmentPredictor()
+    if not predictor.model:
+        raise RuntimeError("No model available for predictor benchmark")
+
+    payloads = synthetic.prediction_payloads(max(batch_sizes), seed=seed)
+    results = []
+
+    # Single-record dict path used by /api/predict/
+    timings = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        predictor.predict(payloads[i % len(payloads)])
+        timings.append(time.perf_counter() - started)
+    results.append(_latency_summary('predict', 1, timings))
+
+    for batch_size in batch_sizes:
+        batch = payloads[:batch_size]
+        predictor.predict_batch(batch)  # warm-up
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            predictor.predict_batch(batch)
+            timings.append(time.perf_counter() - started)
+        results.append(_latency_summary('predict_batch', batch_size, timings))
+    return results
+
+
+def _latency_summary(name, batch_size, timings):
+    import numpy as np
+    arr = np.asarray(timings)
+    median = float(np.median(arr))
+    return {
+        'name': name,
+        'batch_size': batch_size,
+        'repeats': len(arr),
+        'median_ms': round(median * 1000, 4),
+        'p95_ms': round(float(np.percentile(arr, 95)) * 1000, 4),
+        'rows_per_second': round(batch_size / median, 1) if median > 0 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--repeats', type=int, default=20, help='Predictor timing repeats per batch size')
+    parser.add_argument('--max-train-rows', type=int, default=200_000,
+                        help='Subsample the engineered matrix before train_models (0 = no limit)')
+    parser.add_argument('--mongo-backend', default='memory', choices=['memory', 'local', 'atlas'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write JSON results here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='appt-bench-') as workdir:
+        _setup_django(Path(workdir) / 'models', args.mongo_backend)
+        from db.mongo import stop_local_mongod
+        results = {'environment': _environment(), 'config': vars(args), 'pipeline': [], 'predictor': []}
+
+        try:
+            for rows in args.rows:
+                print(f"Benchmarking pipeline with {rows} rows...", file=sys.stderr)
+                results['pipeline'].append(bench_pipeline(rows, workdir, args.max_train_rows, args.seed))
+                print(f"Benchmarking predictor (model trained on {rows} rows)...", file=sys.stderr)
+                results['predictor'].append({
+                    'trained_on_rows': rows,
+                    'batches': bench_predictor(args.batch_sizes, args.repeats, args.seed),
+                })
+        finally:
+            # A mongod spawned for the run would outlive it (and its temporary dbpath)
+            stop_local_mongod()
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(output)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Synthetic appointment generator using the Kaggle "Medical Appointment No Shows" schema.
+
+Distributions roughly follow the public dataset (~20% no-shows, ~35% same-day
+bookings, Zipf-like neighbourhood volumes, SMS only sent for bookings made days
+in advance) and the no-show rate depends on waiting time, age, SMS and
+neighbourhood so the models have real signal to learn. Output is deterministic
+for a given seed and is generated chunk by chunk, so 10M-row files never need
+to be held in memory at once.
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'PatientId', 'AppointmentID', 'Gender', 'ScheduledDay', 'AppointmentDay', 'Age',
+    'Neighbourhood', 'Scholarship', 'Hipertension', 'Diabetes', 'Alcoholism',
+    'Handcap', 'SMS_received', 'No-show',
+]
+
+NEIGHBOURHOODS = [
+    'JARDIM CAMBURI', 'MARIA ORTIZ', 'RESISTÊNCIA', 'JARDIM DA PENHA', 'ITARARÉ',
+    'CENTRO', 'TABUAZEIRO', 'SANTA MARTHA', 'JESUS DE NAZARETH', 'BONFIM',
+    'SANTO ANTÔNIO', 'SANTO ANDRÉ', 'CARATOÍRA', 'JABOUR', 'SÃO PEDRO',
+    'NOVA PALESTINA', 'DA PENHA', 'ANDORINHAS', 'ILHA DO PRÍNCIPE', 'GURIGICA',
+    'SÃO JOSÉ', 'BELA VISTA', 'MARUÍPE', 'FORTE SÃO JOÃO', 'ILHA DE SANTA MARIA',
+    'SÃO CRISTÓVÃO', 'REDENÇÃO', 'SÃO BENEDITO', 'JOANA D´ARC', 'CONSOLAÇÃO',
+    'PRAIA DO SUÁ', 'ROMÃO', 'GRANDE VITÓRIA', 'CRUZAMENTO', 'PRAIA DO CANTO',
+    'SANTOS DUMONT', 'INHANGUETÁ', 'VILA RUBIM', 'SANTA TEREZA', 'ILHA DAS CAIEIRAS',
+    'GOIABEIRAS', 'SANTA LÚCIA', 'MONTE BELO', 'CONQUISTA', 'SANTA HELENA',
+    'REPÚBLICA', 'BENTO FERREIRA', 'PARQUE MOSCOSO', 'DO QUADRO', 'SANTOS REIS',
+    'SOLON BORGES', 'MATA DA PRAIA', 'SANTA CECÍLIA', 'PIEDADE', 'ESTRELINHA',
+    'SANTA LUÍZA', 'DO MOSCOSO', 'SANTA CLARA', 'FONTE GRANDE', 'UNIVERSITÁRIO',
+    'ANTÔNIO HONÓRIO', 'ARIOVALDO FAVALESSA', 'BARRO VERMELHO', 'DE LOURDES',
+    'COMDUSA', 'MÁRIO CYPRESTE', 'BOA VISTA', 'DO CABRAL', 'HORTO', 'FRADINHOS',
+    'ENSEADA DO SUÁ', 'MORADA DE CAMBURI', 'NAZARETH', 'SEGURANÇA DO LAR',
+    'PONTAL DE CAMBURI', 'ILHA DO BOI', 'ILHA DO FRADE', 'AEROPORTO',
+    'ILHAS OCEÂNICAS DE TRINDADE', 'PARQUE INDUSTRIAL',
+]
+
+START_DATE = np.datetime64('2016-04-29')
+SCHEDULE_SPAN_DAYS = 365
+
+
+def _neighbourhood_weights():
+    ranks = np.arange(1, len(NEIGHBOURHOODS) + 1)
+    weights = 1.0 / ranks ** 0.9
+    return weights / weights.sum()
+
+
+def generate(rows, seed=42, id_offset=0):
+    """Return a DataFrame of `rows` synthetic appointments in the Kaggle CSV format."""
+    rng = np.random.default_rng(seed)
+
+    # Waiting time: ~35% same day, otherwise long-tailed up to ~6 months
+    same_day = rng.random(rows) < 0.35
+    wait_days = np.where(same_day, 0, np.minimum(rng.exponential(14, rows).astype(np.int64) + 1, 179))
+
+    appointment_day = START_DATE + rng.integers(0, SCHEDULE_SPAN_DAYS, rows).astype('timedelta64[D]')
+    # Clinics are closed on Sundays (numpy weekday of 1970-01-01 is Thursday -> Sunday == 3)
+    sunday = ((appointment_day - np.datetime64('1970-01-01')).astype(np.int64) % 7) == 3
+    appointment_day = appointment_day + (sunday * rng.integers(1, 6, rows)).astype('timedelta64[D]')
+    scheduled_seconds = rng.integers(7 * 3600, 19 * 3600, rows).astype('timedelta64[s]')
+    scheduled_day = (appointment_day - wait_days.astype('timedelta64[D]')).astype('datetime64[s]') + scheduled_seconds
+
+    age = rng.integers(0, 100, rows)
+    # A handful of invalid / extreme ages like the real dataset
+    odd = rng.random(rows)
+    age = np.where(odd < 0.0005, -1, np.where(odd > 0.9995, 115, age))
+
+    gender = np.where(rng.random(rows) < 0.65, 'F', 'M')
+    neighbourhood_idx = rng.choice(len(NEIGHBOURHOODS), size=rows, p=_neighbourhood_weights())
+    scholarship = (rng.random(rows) < 0.10).astype(np.int64)
+    hipertension = (rng.random(rows) < np.clip(age / 150, 0.02, 0.6)).astype(np.int64)
+    diabetes = (rng.random(rows) < np.clip(age / 400, 0.01, 0.2)).astype(np.int64)
+    alcoholism = (rng.random(rows) < 0.03).astype(np.int64)
+    handcap = rng.choice(5, size=rows, p=[0.98, 0.018, 0.0017, 0.0002, 0.0001])
+    sms = ((wait_days >= 2) & (rng.random(rows) < 0.55)).astype(np.int64)
+
+    # No-show probability
+    neighbourhood_effect = np.linspace(-0.3, 0.4, len(NEIGHBOURHOODS))[neighbourhood_idx]
+    logit = (
+        -1.8
+        + 0.9 * (wait_days > 0)
+        + 0.012 * wait_days
+        - 0.012 * (np.clip(age, 0, 100) - 35)
+        + 0.25 * scholarship
+        + 0.3 * alcoholism
+        - 0.35 * sms
+        + neighbourhood_effect
+    )
+    no_show = rng.random(rows) < 1.0 / (1.0 + np.exp(-logit))
+
+    return pd.DataFrame({
+        'PatientId': rng.integers(10 ** 10, 10 ** 14, rows).astype(np.float64),
+        'AppointmentID': np.arange(5_000_000 + id_offset, 5_000_000 + id_offset + rows),
+        'Gender': gender,
+        'ScheduledDay': np.char.add(np.datetime_as_string(scheduled_day, unit='s'), 'Z'),
+        'AppointmentDay': np.char.add(np.datetime_as_string(appointment_day.astype('datetime64[s]'), unit='s'), 'Z'),
+        'Age': age,
+        'Neighbourhood': np.asarray(NEIGHBOURHOODS, dtype=object)[neighbourhood_idx],
+        'Scholarship': scholarship,
+        'Hipertension': hipertension,
+        'Diabetes': diabetes,
+        'Alcoholism': alcoholism,
+        'Handcap': handcap,
+        'SMS_received': sms,
+        'No-show': np.where(no_show, 'Yes', 'No'),
+    }, columns=COLUMNS)
+
+
+def write_csv(path, rows, seed=42, chunk_size=1_000_000):
+    """Write `rows` synthetic appointments to `path` in chunks. Returns the path."""
+    written = 0
+    chunk_no = 0
+    while written < rows:
+        n = min(chunk_size, rows - written)
+        chunk = generate(n, seed=seed + chunk_no, id_offset=written)
+        chunk.to_csv(path, mode='w' if chunk_no == 0 else 'a', header=chunk_no == 0, index=False)
+        written += n
+        chunk_no += 1
+    return path
+
+
+def prediction_payloads(rows, seed=7):
+    """Request bodies for /api/predict/ drawn from the same distribution."""
+    df = generate(rows, seed=seed)
+    df = df.drop(columns=['PatientId', 'AppointmentID', 'Scholarship', 'No-show'])
+    df['Age'] = df['Age'].clip(0, 110)
+    return df.to_dict(orient='records')
@@ -0,0 +1,160 @@
+"""
+Check that the fast-path validators in api/validation.py agree with the DRF
+serializers, and time both.
+
+Every edge case (missing fields, wrong types, bad datetimes, null and
+surrogate characters, out-of-range numbers, malformed batches) goes through
+both validate_prediction / validate_forecast and the serializer; the
+validated values and error payloads must be identical.
+
+Usage (from backend/):
+    python -m benchmarks.validation_check --repeats 20000
+
+Exits with status 1 on any mismatch.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+BASE = {
+    'ScheduledDay': '2016-04-29T18:38:08Z', 'AppointmentDay': '2016-05-03T00:00:00Z', 'Gender': 'F',
+    'Neighbourhood': 'JARDIM DA PENHA', 'Hipertension': 0, 'Diabetes': 0, 'Alcoholism': 0, 'Handcap': 0,
+    'SMS_received': 1, 'Age': 40,
+}
+# Values tried per field, each also with the field left out
+VARIANTS = {
+    'ScheduledDay': [
+        '2016-04-29', '2016-04-29 18:38', '2016-04-29T18:38:08.123+03:00', '2016-04-29T18:38:08', 'x', '', None, 5,
+        '2016-13-01T00:00:00Z', '20160429T183808', ' 2016-04-29T18:38:08Z', '2016-04-29T18:38:08+0300', [],
+    ],
+    'Gender': ['M', 'f', '', None, 1, ' M', ['M']],
+    'Neighbourhood': ['SÃO JOSÉ', ' X', 'X ', '', '   ', 'a\x00b', 'a\ud800', 1, 1.5, True, None, {'a': 1}],
+    'Hipertension': [1, 2, '1', True, None, -1],
+    'Age': [1, '1', '1.0', '1.5', 1.0, 1.5, True, None, 'x' * 1001, -3, 10 ** 30],
+}
+TOP_LEVEL = [None, [], 'x', [BASE]]
+
+
+def _setup_django():
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+
+
+def _records(appointments):
+    if hasattr(appointments, 'to_dict'):
+        appointments = appointments.to_dict(orient='records')
+    return [dict(a) for a in appointments]
+
+
+def prediction_cases():
+    for field, values in VARIANTS.items():
+        for value in values:
+            yield f"{field}={value!r}"[:80], dict(BASE, **{field: value})
+        yield f"{field} missing", {k: v for k, v in BASE.items() if k != field}
+    for data in TOP_LEVEL:
+        yield f"payload {data!r}"[:80], data
+
+
+def forecast_cases():
+    bad = dict(BASE, Age='x')
+    yield 'two valid', {'appointments': [BASE, BASE]}
+    yield 'one invalid', {'appointments': [BASE, bad]}
+    yield 'empty list', {'appointments': []}
+    yield 'not a list', {'appointments': BASE}
+    yield 'no appointments', {}
+    yield 'non-dict item', {'appointments': [BASE, 'x']}
+    yield 'confidence out of range', {'appointments': [BASE], 'confidence': 2}
+    yield 'confidence string', {'appointments': [BASE], 'confidence': '0.9'}
+    yield 'confidence bool', {'appointments': [BASE], 'confidence': True}
+    yield 'confidence', {'appointments': [BASE], 'confidence': 0.9}
+    for field, values in VARIANTS.items():
+        for value in values:
+            yield f"item {field}={value!r}"[:80], {'appointments': [BASE, dict(BASE, **{field: value})]}
+
+
+def check():
+    """Returns the labels of the cases where the fast path and DRF disagree."""
+    from api.serializers import PredictionInputSerializer, ScheduleForecastInputSerializer
+    from api.validation import validate_prediction, validate_forecast
+
+    mismatches = []
+    count = 0
+    for label, data in prediction_cases():
+        count += 1
+        serializer = PredictionInputSerializer(data=data)
+        ok = serializer.is_valid()
+        expected = (dict(serializer.validated_data), None) if ok else (None, json.dumps(serializer.errors))
+        validated, errors = validate_prediction(data)
+        got = (dict(validated) if validated is not None else None, json.dumps(errors) if errors is not None else None)
+        if expected != got:
+            mismatches.append(f"predict {label}: DRF {expected} fast {got}")
+
+    for label, data in forecast_cases():
+        count += 1
+        serializer = ScheduleForecastInputSerializer(data=data)
+        if serializer.is_valid():
+            expected = (_records(serializer.validated_data['appointments']), serializer.validated_data['confidence'], None)
+        else:
+            expected = (None, None, json.dumps(serializer.errors))
+        validated, errors = validate_forecast(data)
+        if validated is not None:
+            got = (_records(validated['appointments']), validated['confidence'], None)
+        else:
+            got = (None, None, json.dumps(errors))
+        if expected != got:
+            mismatches.append(f"forecast {label}: DRF {expected} fast {got}")
+    print(f"{count} cases, {len(mismatches)} mismatch(es)")
+    return mismatches
+
+
+def timing(repeats, batch_size):
+    from api.serializers import PredictionInputSerializer, ScheduleForecastInputSerializer
+    from api.validation import validate_prediction, validate_forecast
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        serializer = PredictionInputSerializer(data=BASE)
+        serializer.is_valid()
+        serializer.validated_data
+    drf = (time.perf_counter() - started) / repeats
+    started = time.perf_counter()
+    for _ in range(repeats):
+        validate_prediction(BASE)
+    fast = (time.perf_counter() - started) / repeats
+    print(f"predict:  DRF {drf * 1e6:8.1f} us  fast {fast * 1e6:8.1f} us  ({drf / fast:.1f}x)")
+
+    payload = {'appointments': [dict(BASE, Age=i % 90) for i in range(batch_size)]}
+    started = time.perf_counter()
+    ScheduleForecastInputSerializer(data=payload).is_valid()
+    drf = time.perf_counter() - started
+    started = time.perf_counter()
+    validate_forecast(payload)
+    fast = time.perf_counter() - started
+    print(f"forecast: DRF {drf * 1e3:8.1f} ms  fast {fast * 1e3:8.1f} ms  ({drf / fast:.1f}x, {batch_size} appointments)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=20000, help='Single predictions timed per validator (0 skips timing)')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Appointments in the timed forecast payload')
+    args = parser.parse_args(argv)
+
+    _setup_django()
+    mismatches = check()
+    for mismatch in mismatches:
+        print(mismatch, file=sys.stderr)
+    if args.repeats:
+        timing(args.repeats, args.batch_size)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_asgi_application()
+
+from core.startup import start_index_creation, start_predictor_warmup  # noqa: E402
+start_index_creation()
+start_predictor_warmup()
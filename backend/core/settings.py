@@ -93,6 +93,92 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 
+# "atlas" connects to MONGO_URI; "memory" uses the in-process stand-in in db/memory.py
+# (benchmarks, offline development); "local" uses a mongod on MONGO_LOCAL_HOST:PORT,
+# spawned on demand (MONGOD_PATH or mongod on PATH, data in MONGO_LOCAL_DBPATH) and left
+# running for the other workers and later runs.
+MONGO_BACKEND = os.getenv("MONGO_BACKEND", "atlas")
+# memory backend only: collections whose inserts are counted but not kept (benchmarks)
+MONGO_MEMORY_DISCARD = [c.strip() for c in os.getenv("MONGO_MEMORY_DISCARD", "").split(",") if c.strip()]
+MONGO_LOCAL_HOST = os.getenv("MONGO_LOCAL_HOST", "127.0.0.1")
+MONGO_LOCAL_PORT = int(os.getenv("MONGO_LOCAL_PORT", "27017"))
+MONGO_LOCAL_DBPATH = Path(os.getenv("MONGO_LOCAL_DBPATH", Path.home() / ".cache" / "appointment-predictor" / "mongo"))
+MONGOD_PATH = os.getenv("MONGOD_PATH")
+
+# Client pool / timeouts (db/mongo.py). A bounded wait for a pooled connection and
+# socket timeouts keep tail latency predictable when the cluster is slow.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+# e.g. "zstd,snappy,zlib" (zstd / snappy need the zstandard / python-snappy packages)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+# primary, primaryPreferred, secondary, secondaryPreferred or nearest
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+# Training data and model artifact locations (overridable for benchmarks).
+DATASET_PATH = Path(os.getenv("DATASET_PATH", BASE_DIR.parent / "data" / "dataset.csv"))
+MODELS_DIR = Path(os.getenv("MODELS_DIR", BASE_DIR / "models"))
+# Model versions kept per registry channel (ml/model_registry.py); current versions are never removed
+MODEL_RETENTION = int(os.getenv("MODEL_RETENTION", "5"))
+
+# "memory" loads the whole dataset (GridSearchCV + SMOTE); "streaming" trains out-of-core with
+# partial_fit estimators over chunks of TRAINING_CHUNK_SIZE rows (ml/streaming.py).
+TRAINING_MODE = os.getenv("TRAINING_MODE", "memory")
+TRAINING_CHUNK_SIZE = int(os.getenv("TRAINING_CHUNK_SIZE", "100000"))
+STREAMING_EPOCHS = int(os.getenv("STREAMING_EPOCHS", "2"))
+STREAMING_HOLDOUT_FRACTION = float(os.getenv("STREAMING_HOLDOUT_FRACTION", "0.2"))
+
+# Per-neighbourhood models (ml/segments.py). Segments with fewer rows use the global model;
+# each worker keeps at most SEGMENT_CACHE_SIZE segment models in memory (LRU).
+SEGMENT_MODELS_ENABLED = os.getenv("SEGMENT_MODELS_ENABLED", "false").lower() == "true"
+SEGMENT_MIN_ROWS = int(os.getenv("SEGMENT_MIN_ROWS", "2000"))
+SEGMENT_TRAINING_JOBS = int(os.getenv("SEGMENT_TRAINING_JOBS", "-1"))
+SEGMENT_CACHE_SIZE = int(os.getenv("SEGMENT_CACHE_SIZE", "8"))
+
+# Bootstrap resamples for the confidence intervals stored in model_evaluation (0 disables)
+EVALUATION_BOOTSTRAP_ROUNDS = int(os.getenv("EVALUATION_BOOTSTRAP_ROUNDS", "1000"))
+
+# Predictor warm-up: while no model exists yet, retry loading every N seconds
+WARMUP_RETRY_SECONDS = int(os.getenv("WARMUP_RETRY_SECONDS", "30"))
+# Each worker checks the registry's current version every N seconds and reloads when it
+# changes (a rollback or retrain through another worker); 0 disables
+MODEL_WATCH_SECONDS = int(os.getenv("MODEL_WATCH_SECONDS", "30"))
+
+# Each worker adds its drift histogram counts to Mongo every N seconds (ml/drift.py),
+# so /api/drift/ covers the traffic of all workers
+DRIFT_FLUSH_SECONDS = float(os.getenv("DRIFT_FLUSH_SECONDS", "10"))
+
+# Write-behind audit log of predictions (ml/prediction_log.py)
+PREDICTION_LOG_ENABLED = os.getenv("PREDICTION_LOG_ENABLED", "true").lower() == "true"
+PREDICTION_LOG_SAMPLE_RATE = float(os.getenv("PREDICTION_LOG_SAMPLE_RATE", "1.0"))
+PREDICTION_LOG_QUEUE_SIZE = int(os.getenv("PREDICTION_LOG_QUEUE_SIZE", "10000"))
+PREDICTION_LOG_BATCH_SIZE = int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500"))
+PREDICTION_LOG_FLUSH_INTERVAL = float(os.getenv("PREDICTION_LOG_FLUSH_INTERVAL", "2.0"))
+
+# Shadow scoring (ml/shadow.py): challenger model versions scored in the background
+# against the serving model. Comma-separated versions; "latest" = newest non-current version.
+SHADOW_CHALLENGERS = [v.strip() for v in os.getenv("SHADOW_CHALLENGERS", "").split(",") if v.strip()]
+# Rows (not submissions) waiting to be shadow-scored before new submissions are shed
+SHADOW_QUEUE_ROWS = int(os.getenv("SHADOW_QUEUE_ROWS", "50000"))
+SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", "256"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "1.0"))
+
+# Per-feature explanations (ml/explain.py): LRU cache entries per worker
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "10000"))
+
+# Optional directory for per-stage cProfile dumps of the training pipeline.
+# Leave unset to disable profiling overhead.
+PIPELINE_PROFILE_DIR = os.getenv("PIPELINE_PROFILE_DIR")
+
+# A RUNNING pipeline_status older than this is treated as abandoned (its worker died),
+# so a new retrain can claim the run
+PIPELINE_STALE_SECONDS = int(os.getenv("PIPELINE_STALE_SECONDS", "21600"))
+
 
 
 # Password validation
@@ -138,6 +224,10 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Bearer token for the admin-only API actions (retrain, ...), see api/permissions.py.
+# Unset: only staff users (session / basic auth) can use them.
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
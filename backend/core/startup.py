@@ -4,42 +4,137 @@ import os
 
 logger = logging.getLogger(__name__)
 
+_pipeline_thread = None
+_pipeline_lock = threading.Lock()
+
 def run_startup_pipeline():
     if os.environ.get('RUN_MAIN') != 'true':
         # Avoid running twice in dev mode with reloader
         return
 
-    logger.info("Starting ML Pipeline in background thread...")
-    thread = threading.Thread(target=_pipeline_worker)
-    thread.daemon = True
-    thread.start()
+    def run():
+        # Claiming the run talks to Mongo; keep that off the app-loading thread
+        try:
+            if not start_pipeline():
+                logger.info("Startup retrain skipped: a pipeline run is already in progress.")
+        except Exception as e:
+            logger.error(f"Failed to start the startup pipeline: {e}")
+
+    threading.Thread(target=run, name='startup-pipeline', daemon=True).start()
+
+def start_index_creation():
+    """
+    Create the MongoDB indexes (db.mongo.INDEXES) in the background when the
+    server process starts. Idempotent; a failure is logged and does not stop
+    the server.
+    """
+    def run():
+        from db.mongo import ensure_indexes
+        try:
+            ensure_indexes()
+        except Exception as e:
+            logger.error(f"Failed to create MongoDB indexes: {e}")
+
+    threading.Thread(target=run, name='mongo-indexes', daemon=True).start()
+
+def start_predictor_warmup():
+    """
+    Load and warm up the serving model in the background as soon as the
+    server process starts (called from the WSGI/ASGI entry points, so
+    management commands never load a model). Readiness reports 503 until done.
+    """
+    from ml.predictor import get_predictor
+    get_predictor().start_warmup()
+
+def _claim_pipeline_run():
+    """
+    Mark the pipeline RUNNING in pipeline_status unless another process already
+    runs it; returns False if it does. One atomic upsert: the filter matches
+    the status document only when it is not RUNNING (or its run started more
+    than PIPELINE_STALE_SECONDS ago, e.g. the worker died mid-run), so with a
+    live run the upsert collides with the existing _id instead.
+    """
+    from db.mongo import get_collection
+    from django.conf import settings
+    from pymongo.errors import DuplicateKeyError
+    import datetime
+
+    now = datetime.datetime.now()
+    stale = now - datetime.timedelta(seconds=getattr(settings, "PIPELINE_STALE_SECONDS", 21600))
+    try:
+        get_collection("pipeline_status").update_one(
+            {
+                "_id": "current_status",
+                "$or": [{"status": {"$ne": "RUNNING"}}, {"start_time": {"$lt": stale}}],
+            },
+            {
+                "$set": {"status": "RUNNING", "start_time": now},
+                "$unset": {"end_time": "", "error": "", "profile": "", "progress": ""},
+            },
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+def start_pipeline():
+    """
+    Claim the run in pipeline_status (so RUNNING is visible as soon as this
+    returns) and start the ML pipeline in a background thread.
+    Returns False if a run is already in progress in this or another process.
+    """
+    global _pipeline_thread
+    with _pipeline_lock:
+        if _pipeline_thread is not None and _pipeline_thread.is_alive():
+            return False
+        if not _claim_pipeline_run():
+            return False
+        logger.info("Starting ML Pipeline in background thread...")
+        _pipeline_thread = threading.Thread(target=_pipeline_worker)
+        _pipeline_thread.daemon = True
+        _pipeline_thread.start()
+        return True
 
 def _pipeline_worker():
     logger.info("ML Pipeline Worker Started")
     from db.mongo import get_collection
+    from django.conf import settings
+    from ml.profiling import PipelineProfiler
     import datetime
-    
+
     status_col = get_collection("pipeline_status")
-    
-    try:
+
+    def report_progress(progress):
         status_col.update_one(
-            {"_id": "current_status"}, 
-            {"$set": {"status": "RUNNING", "start_time": datetime.datetime.now()}}, 
+            {"_id": "current_status"},
+            {"$set": {"progress": progress}},
             upsert=True
         )
-        
+
+    profiler = None
+    try:
+        # start_pipeline() has already marked the run RUNNING
         import ml.pipeline_orchestrator
-        ml.pipeline_orchestrator.run()
-        
+        profiler = PipelineProfiler(
+            on_progress=report_progress,
+            profile_dir=getattr(settings, "PIPELINE_PROFILE_DIR", None),
+        )
+        profile = ml.pipeline_orchestrator.run(profiler=profiler)
+
+        # Warm up the freshly trained model and hot-swap it into the serving predictor;
+        # the previous model keeps serving until the new one is ready
+        from ml.predictor import get_predictor
+        get_predictor().reload()
+
         status_col.update_one(
-            {"_id": "current_status"}, 
-            {"$set": {"status": "COMPLETED", "end_time": datetime.datetime.now()}}, 
+            {"_id": "current_status"},
+            {"$set": {"status": "COMPLETED", "end_time": datetime.datetime.now(), "profile": profile}},
             upsert=True
         )
     except Exception as e:
         logger.error(f"Pipeline Worker Failed: {e}")
-        status_col.update_one(
-            {"_id": "current_status"}, 
-            {"$set": {"status": "FAILED", "error": str(e), "end_time": datetime.datetime.now()}}, 
-            upsert=True
-        )
+        failed = {"status": "FAILED", "error": str(e), "end_time": datetime.datetime.now()}
+        if profiler is not None:
+            # Stages that ran, including the one that failed
+            failed["profile"] = profiler.report()
+        status_col.update_one({"_id": "current_status"}, {"$set": failed}, upsert=True)
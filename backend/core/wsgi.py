@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_wsgi_application()
+
+from core.startup import start_index_creation, start_predictor_warmup  # noqa: E402
+start_index_creation()
+start_predictor_warmup()
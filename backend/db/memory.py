@@ -0,0 +1,214 @@
+"""
+In-process stand-in for the subset of the pymongo API used by this project.
+Selected with MONGO_BACKEND=memory so the pipeline, API and benchmarks can run
+without a MongoDB Atlas cluster. Data lives only as long as the process.
+"""
+import copy
+import threading
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+
+_OPERATORS = {
+    '$ne': lambda value, arg: value != arg,
+    '$lt': lambda value, arg: value is not None and value < arg,
+    '$gt': lambda value, arg: value is not None and value > arg,
+}
+
+
+def _is_operator(value):
+    return isinstance(value, dict) and bool(value) and all(k.startswith('$') for k in value)
+
+
+def _matches(doc, query):
+    """Equality, $ne / $lt / $gt and top-level $or; enough for this project's filters."""
+    for key, value in (query or {}).items():
+        if key == '$or':
+            if not any(_matches(doc, clause) for clause in value):
+                return False
+        elif _is_operator(value):
+            if not all(_OPERATORS[op](doc.get(key), arg) for op, arg in value.items()):
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class MemoryCursor:
+    def __init__(self, docs):
+        self._docs = docs
+        self._limit = 0
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def __iter__(self):
+        docs = self._docs[:self._limit] if self._limit else self._docs
+        for doc in docs:
+            yield copy.deepcopy(doc)
+
+
+class MemoryCollection:
+    """
+    With store=False inserts are only counted (`discarded`), not kept: for bulk
+    collections like cleaned_data whose millions of documents would otherwise
+    dominate the benchmark process's memory.
+    """
+
+    def __init__(self, name, store=True):
+        self.name = name
+        self.store = store
+        self.discarded = 0
+        self._docs = []
+        self._lock = threading.Lock()
+        self.indexes = {}
+
+    def create_index(self, keys, **kwargs):
+        # Only recorded (queries here are linear scans); returns pymongo's index name
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = kwargs.get('name') or '_'.join(f"{field}_{direction}" for field, direction in keys)
+        self.indexes[name] = keys
+        return name
+
+    def insert_one(self, document):
+        document.setdefault('_id', ObjectId())
+        with self._lock:
+            if self.store:
+                self._docs.append(dict(document))
+            else:
+                self.discarded += 1
+        return InsertOneResult(document['_id'])
+
+    def insert_many(self, documents, ordered=True):
+        ids = []
+        stored = []
+        for document in documents:
+            document.setdefault('_id', ObjectId())
+            ids.append(document['_id'])
+            stored.append(dict(document))
+        with self._lock:
+            if self.store:
+                self._docs.extend(stored)
+            else:
+                self.discarded += len(stored)
+        return InsertManyResult(ids)
+
+    def find(self, filter=None):
+        with self._lock:
+            docs = [d for d in self._docs if _matches(d, filter)]
+        return MemoryCursor(docs)
+
+    def find_one(self, filter=None):
+        with self._lock:
+            for doc in self._docs:
+                if _matches(doc, filter):
+                    return copy.deepcopy(doc)
+        return None
+
+    def update_one(self, filter, update, upsert=False):
+        with self._lock:
+            for doc in self._docs:
+                if _matches(doc, filter):
+                    self._apply_update(doc, update)
+                    return UpdateResult(1, 1)
+            if not upsert:
+                return UpdateResult(0, 0)
+            doc = {k: v for k, v in filter.items() if not k.startswith('$') and not _is_operator(v)}
+            if '_id' in doc and any(d['_id'] == doc['_id'] for d in self._docs):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id: {doc['_id']!r}")
+            doc.setdefault('_id', ObjectId())
+            self._apply_update(doc, update)
+            self._docs.append(doc)
+            return UpdateResult(0, 0, upserted_id=doc['_id'])
+
+    def delete_many(self, filter):
+        with self._lock:
+            before = len(self._docs)
+            self._docs = [d for d in self._docs if not _matches(d, filter)]
+            return DeleteResult(before - len(self._docs))
+
+    def count_documents(self, filter):
+        with self._lock:
+            return sum(1 for d in self._docs if _matches(d, filter))
+
+    @staticmethod
+    def _apply_update(doc, update):
+        def parent(key):
+            # Dotted keys address (and create) nested documents, as in Mongo
+            *path, field = key.split('.')
+            target = doc
+            for part in path:
+                target = target.setdefault(part, {})
+            return target, field
+
+        for key, value in update.get('$set', {}).items():
+            target, field = parent(key)
+            target[field] = copy.deepcopy(value)
+        for key in update.get('$unset', {}):
+            target, field = parent(key)
+            target.pop(field, None)
+        for key, value in update.get('$inc', {}).items():
+            target, field = parent(key)
+            target[field] = target.get(field, 0) + value
+        for key, value in update.get('$max', {}).items():
+            target, field = parent(key)
+            if field not in target or value > target[field]:
+                target[field] = value
+
+
+class MemoryDatabase:
+    def __init__(self, name, discard=()):
+        self.name = name
+        self.discard = set(discard)
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, collection_name):
+        with self._lock:
+            if collection_name not in self._collections:
+                self._collections[collection_name] = MemoryCollection(
+                    collection_name, store=collection_name not in self.discard
+                )
+            return self._collections[collection_name]
+
+    def drop(self):
+        with self._lock:
+            self._collections.clear()
+
+
+class MemoryClient:
+    def __init__(self, discard=()):
+        # Collections whose inserts are counted but not kept, see MemoryCollection
+        self.discard = tuple(discard)
+        self._databases = {}
+
+    def __getitem__(self, db_name):
+        if db_name not in self._databases:
+            self._databases[db_name] = MemoryDatabase(db_name, self.discard)
+        return self._databases[db_name]
+
+    def close(self):
+        pass
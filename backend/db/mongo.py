@@ -1,39 +1,199 @@
 import os
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
 import pymongo
+from pymongo import ASCENDING, DESCENDING
 from django.conf import settings
 import certifi
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 _client = None
+_mongod = None
+# Serializes client creation (and spawning a local mongod): startup threads and
+# the first requests can all call get_db_handle() at once
+_client_lock = threading.Lock()
+
+# Indexes the views, logs and monitors query by. pipeline_status is looked up by
+# _id, and model_evaluation holds a single document, so neither needs one.
+INDEXES = {
+    "prediction_log": [
+        ([("created_at", DESCENDING)], {}),
+        ([("model_version", ASCENDING), ("created_at", DESCENDING)], {}),
+    ],
+    "shadow_evaluation": [
+        ([("champion_version", ASCENDING)], {}),
+    ],
+}
+
+def _backend():
+    return (getattr(settings, "MONGO_BACKEND", None) or os.getenv("MONGO_BACKEND") or "atlas").lower()
+
+def _client_options():
+    """
+    Pool, timeout, compression and read preference options from settings.
+    Bounded pool waits and socket timeouts make a slow or unreachable cluster
+    fail fast instead of piling up request threads.
+    """
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "readPreference": settings.MONGO_READ_PREFERENCE,
+        "appname": "appointment-predictor",
+    }
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
+
+def _port_open(host, port):
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+def _start_local_mongod(host, port):
+    """
+    Spawn a mongod for the local backend in its own session, so it outlives the
+    worker that happened to start it and keeps serving the others. A lock file
+    next to the dbpath lets only one process spawn it; the rest wait and find
+    the port open. Nothing stops it on exit: stop_local_mongod() is for callers
+    that own its lifecycle (e.g. the benchmarks).
+    """
+    global _mongod
+    binary = settings.MONGOD_PATH or shutil.which("mongod")
+    if not binary:
+        raise RuntimeError(
+            f"No MongoDB listening on {host}:{port} and no mongod binary found "
+            "(set MONGOD_PATH, start mongod yourself, or use MONGO_BACKEND=memory)."
+        )
+    dbpath = Path(settings.MONGO_LOCAL_DBPATH)
+    dbpath.mkdir(parents=True, exist_ok=True)
+    with open(dbpath.parent / f"{dbpath.name}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+        if _port_open(host, port):
+            return  # started by another process while this one waited
+        logger.info(f"Starting local mongod on {host}:{port} (dbpath {dbpath})")
+        process = subprocess.Popen(
+            [binary, "--dbpath", str(dbpath), "--bind_ip", host, "--port", str(port), "--quiet"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT, start_new_session=True,
+        )
+        deadline = time.monotonic() + 30
+        while not _port_open(host, port):
+            if process.poll() is not None:
+                raise RuntimeError(f"mongod exited with code {process.returncode}")
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("Timed out waiting for the local mongod to start")
+            time.sleep(0.2)
+    _mongod = process
+    logger.info(f"Local mongod running as pid {process.pid}; it keeps running after this process exits.")
+
+def stop_local_mongod():
+    """
+    Shut down the mongod this process spawned, if any. Server processes never
+    call it: their mongod is shared with the other workers.
+    """
+    global _mongod
+    if _mongod is not None and _mongod.poll() is None:
+        _mongod.terminate()
+        try:
+            _mongod.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _mongod.kill()
+    _mongod = None
+
+def _local_client():
+    """
+    MONGO_BACKEND=local: a mongod on MONGO_LOCAL_HOST:MONGO_LOCAL_PORT, started
+    on demand if nothing is listening there. Same driver and wire protocol as
+    Atlas, without the network, for offline development and benchmarks.
+    """
+    host, port = settings.MONGO_LOCAL_HOST, settings.MONGO_LOCAL_PORT
+    if not _port_open(host, port):
+        _start_local_mongod(host, port)
+    client = pymongo.MongoClient(host, port, **_client_options())
+    client.admin.command('ping')
+    logger.info(f"Connected to local MongoDB at {host}:{port}.")
+    return client
+
+def _create_client():
+    if _backend() == "memory":
+        from .memory import MemoryClient
+        logger.info("Using in-memory MongoDB stand-in (MONGO_BACKEND=memory).")
+        return MemoryClient(discard=getattr(settings, "MONGO_MEMORY_DISCARD", ()))
+    if _backend() == "local":
+        return _local_client()
+
+    mongo_uri = getattr(settings, "MONGO_URI", None) or os.getenv("MONGO_URI")
+    if not mongo_uri:
+        logger.error("MONGO_URI not set!")
+        raise ValueError("MONGO_URI not set in environment or settings.")
+
+    try:
+        # Use certifi for updated CA bundle
+        client = pymongo.MongoClient(mongo_uri, tlsCAFile=certifi.where(), **_client_options())
+        # Check connection
+        client.admin.command('ping')
+        logger.info("Connected to MongoDB Atlas successfully.")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {e}")
+        raise e
 
 def get_db_handle():
     global _client
-    if _client is None:
-        mongo_uri = getattr(settings, "MONGO_URI", None) or os.getenv("MONGO_URI")
-        if not mongo_uri:
-            logger.error("MONGO_URI not set!")
-            raise ValueError("MONGO_URI not set in environment or settings.")
-        
-        try:
-            # Use certifi for updated CA bundle
-            _client = pymongo.MongoClient(mongo_uri, tlsCAFile=certifi.where())
-            # Check connection
-            _client.admin.command('ping')
-            logger.info("Connected to MongoDB Atlas successfully.")
-        except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            raise e
-            
-    db_name = "appointment_predictor" 
-    return _client[db_name]
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+            client = _client
+
+    db_name = "appointment_predictor"
+    return client[db_name]
+
+def ensure_indexes():
+    """
+    Create the INDEXES (idempotent; existing indexes are left alone).
+    Run once per server process at startup. Returns the created index names.
+    """
+    db = get_db_handle()
+    created = []
+    for collection_name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            created.append(db[collection_name].create_index(keys, **options))
+    logger.info(f"MongoDB indexes ensured: {created}")
+    return created
+
+def set_client(client):
+    """Install a pre-built client (e.g. db.memory.MemoryClient) in place of the configured one."""
+    global _client
+    with _client_lock:
+        _client = client
 
 def close_connection():
     global _client
-    if _client:
-        _client.close()
-        _client = None
+    with _client_lock:
+        if _client:
+            _client.close()
+            _client = None
 
 def get_collection(collection_name):
     db = get_db_handle()
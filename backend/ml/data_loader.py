@@ -2,15 +2,15 @@ import pandas as pd
 from django.conf import settings
 import logging
 import os
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-def load_data():
-    """Load the dataset from CSV file."""
+def load_data(csv_path=None):
+    """Load the dataset from CSV file (defaults to settings.DATASET_PATH)."""
     try:
-        # BASE_DIR is backend/
-        # data is in backend/../data/
-        csv_path = settings.BASE_DIR.parent / 'data' / 'dataset.csv'
+        # Default: backend/../data/dataset.csv
+        csv_path = Path(csv_path or settings.DATASET_PATH)
         
         if not csv_path.exists():
             logger.error(f"Dataset not found at {csv_path}")
@@ -23,3 +23,16 @@ def load_data():
     except Exception as e:
         logger.error(f"Error loading data: {e}")
         raise e
+
+def iter_chunks(csv_path=None, chunksize=None):
+    """
+    Stream the dataset as DataFrames of at most `chunksize` rows
+    (default settings.TRAINING_CHUNK_SIZE), for datasets that don't fit in memory.
+    """
+    csv_path = Path(csv_path or settings.DATASET_PATH)
+    if not csv_path.exists():
+        logger.error(f"Dataset not found at {csv_path}")
+        raise FileNotFoundError(f"Dataset not found at {csv_path}")
+    chunksize = chunksize or settings.TRAINING_CHUNK_SIZE
+    logger.info(f"Streaming dataset from {csv_path} in chunks of {chunksize}")
+    yield from pd.read_csv(csv_path, chunksize=chunksize)
@@ -0,0 +1,277 @@
+import datetime
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from db.mongo import get_collection
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_BINS = 10        # decile bins for continuous features
+CATEGORICAL_MAX_VALUES = 128  # features with at most this many distinct values are binned per value
+SCORE_BINS = 20
+PSI_EPSILON = 1e-4
+# Conventional PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# PSI over many sparse bins is noisy on small samples; don't flag before this many observations
+MIN_OBSERVATIONS = 1000
+
+
+def _feature_reference(values, nominal=False):
+    """Fixed binning + training counts for one feature."""
+    values = np.asarray(values, dtype=np.float64)
+    distinct = np.unique(values)
+    if len(distinct) <= CATEGORICAL_MAX_VALUES:
+        counts = np.searchsorted(distinct, values)
+        counts = np.bincount(counts, minlength=len(distinct)).tolist() + [0]  # last bucket: unseen values
+        return {'kind': 'nominal' if nominal else 'ordinal', 'values': distinct.tolist(), 'counts': counts}
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, NUMERIC_BINS + 1)[1:-1]))
+    counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+    return {'kind': 'numeric', 'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def build_reference(X, model, y=None):
+    """
+    Training reference for drift monitoring: per-feature histograms of the
+    (pre-SMOTE) engineered features and the model's P(show) histogram on them.
+    """
+    features = {
+        col: _feature_reference(X[col], nominal=(col == 'Neighbourhood'))
+        for col in X.columns
+    }
+    proba_show = model.predict_proba(X)[:, 0]
+    score_edges = np.linspace(0, 1, SCORE_BINS + 1)[1:-1]
+    score_counts = np.bincount(np.searchsorted(score_edges, proba_show, side='right'), minlength=SCORE_BINS)
+    return {
+        'feature_order': list(X.columns),
+        'rows': len(X),
+        'features': features,
+        'score': {'kind': 'numeric', 'edges': score_edges.tolist(), 'counts': score_counts.tolist()},
+        'no_show_rate': float(np.mean(y)) if y is not None else None,
+        'mean_proba_no_show': float(1 - proba_show.mean()),
+    }
+
+
+def save_reference(reference):
+    """
+    Mirror the reference into engineered_features_metadata. The file copy the
+    predictor loads is stored with the model version by the registry.
+    """
+    try:
+        get_collection("engineered_features_metadata").update_one(
+            {}, {"$set": {"drift_reference": reference}}, upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to persist drift reference: {e}")
+
+
+def psi(expected_counts, actual_counts):
+    expected = np.asarray(expected_counts, dtype=np.float64)
+    actual = np.asarray(actual_counts, dtype=np.float64)
+    if actual.sum() == 0 or expected.sum() == 0:
+        return None
+    e = np.clip(expected / expected.sum(), PSI_EPSILON, None)
+    a = np.clip(actual / actual.sum(), PSI_EPSILON, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def binned_ks(expected_counts, actual_counts):
+    """KS statistic on the shared bins (exact for discrete features, bin-resolution for continuous)."""
+    expected = np.asarray(expected_counts, dtype=np.float64)
+    actual = np.asarray(actual_counts, dtype=np.float64)
+    if actual.sum() == 0 or expected.sum() == 0:
+        return None
+    return float(np.max(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum())))
+
+
+class _Histogram:
+    """Fixed-size streaming histogram using the reference binning, plus running moments."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.kind = spec['kind']
+        if self.kind == 'numeric':
+            self.edges = np.asarray(spec['edges'], dtype=np.float64)
+        else:
+            self.values = np.asarray(spec['values'], dtype=np.float64)
+        self.counts = np.zeros(len(spec['counts']), dtype=np.int64)
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def summarize(self, values, unseen=None):
+        """(counts, n, total, total_sq) of a batch; `unseen` rows go to the unseen bucket."""
+        values = np.asarray(values, dtype=np.float64)
+        if self.kind == 'numeric':
+            idx = np.searchsorted(self.edges, values, side='right')
+        else:
+            # Nearest reference value; scaled values can differ in the last float bits
+            hi = np.clip(np.searchsorted(self.values, values), 0, len(self.values) - 1)
+            lo = np.clip(hi - 1, 0, len(self.values) - 1)
+            idx = np.where(np.abs(self.values[lo] - values) < np.abs(self.values[hi] - values), lo, hi)
+            close = np.abs(self.values[idx] - values) <= 1e-9 * np.maximum(1.0, np.abs(values))
+            if unseen is not None:
+                close &= ~unseen
+            idx = np.where(close, idx, len(self.values))  # unseen -> last bucket
+        counts = np.bincount(idx, minlength=len(self.counts))
+        return counts, len(values), float(values.sum()), float(np.square(values).sum())
+
+    def add(self, counts, n, total, total_sq):
+        self.counts += counts
+        self.n += n
+        self.total += total
+        self.total_sq += total_sq
+
+    def add_persisted(self, doc):
+        """Add counters stored by DriftMonitor._flush ({'counts': {bin: n}, 'n', 'total', 'total_sq'})."""
+        for index, count in (doc.get('counts') or {}).items():
+            self.counts[int(index)] += count
+        self.n += doc.get('n', 0)
+        self.total += doc.get('total', 0.0)
+        self.total_sq += doc.get('total_sq', 0.0)
+
+    def report(self):
+        result = {'n': self.n, 'psi': psi(self.spec['counts'], self.counts)}
+        if self.kind != 'nominal':
+            result['ks'] = binned_ks(self.spec['counts'], self.counts)
+        if self.n:
+            mean = self.total / self.n
+            result['mean'] = mean
+            result['std'] = float(np.sqrt(max(self.total_sq / self.n - mean ** 2, 0.0)))
+        if self.kind != 'numeric':
+            result['unseen'] = int(self.counts[-1])
+        if result['psi'] is not None and self.n < MIN_OBSERVATIONS:
+            result['status'] = 'insufficient_data'
+        elif result['psi'] is not None:
+            result['status'] = 'alert' if result['psi'] > PSI_ALERT else 'warn' if result['psi'] > PSI_WARN else 'ok'
+        return result
+
+
+class DriftMonitor:
+    """
+    Online feature- and score-drift monitor.
+
+    Live traffic is folded into fixed-size histograms that use the training
+    reference's bins, so memory is constant and PSI / KS are computed from the
+    counts on demand without re-scanning any logs.
+
+    Each process keeps its own histograms (`report`). The bin counts added
+    since the last flush are also written every `flush_interval` seconds by a
+    background thread, as $inc counters in `collection_name` keyed by model
+    version, so `combined_report` covers the traffic of every API worker.
+    """
+
+    def __init__(self, reference, version=None, collection_name="drift_counts", flush_interval=10.0):
+        self.reference = reference
+        self.version = version
+        self.collection_name = collection_name
+        self.flush_interval = flush_interval
+        self.feature_order = reference['feature_order']
+        self._features = self._histograms()
+        self._score = _Histogram(reference['score'])
+        # {document path: (counts, n, total, total_sq)} not yet written to Mongo
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _histograms(self):
+        return {name: _Histogram(self.reference['features'][name]) for name in self.feature_order}
+
+    def update(self, X_input: pd.DataFrame, proba_show, known=None):
+        """
+        Fold a scored batch in. `known` (from prepare_features) marks rows whose
+        neighbourhood was seen in training; the others were encoded as the mode
+        and are counted in the Neighbourhood "unseen" bucket instead.
+        """
+        unseen = ~np.asarray(known, dtype=bool) if known is not None else None
+        deltas = {
+            f"features.{name}": (hist, hist.summarize(X_input[name].to_numpy(), unseen if name == 'Neighbourhood' else None))
+            for name, hist in self._features.items()
+        }
+        deltas['score'] = (self._score, self._score.summarize(proba_show))
+        with self._lock:
+            for path, (hist, delta) in deltas.items():
+                hist.add(*delta)
+                self._merge_pending(path, delta)
+        if self.version is not None and self.flush_interval:
+            self._ensure_started()
+
+    def _merge_pending(self, path, delta):
+        previous = self._pending.get(path)
+        self._pending[path] = delta if previous is None else tuple(a + b for a, b in zip(previous, delta))
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="drift-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        inc = {}
+        for path, (counts, n, total, total_sq) in pending.items():
+            for index in np.flatnonzero(counts):
+                inc[f"{path}.counts.{index}"] = int(counts[index])
+            inc[f"{path}.n"] = int(n)
+            inc[f"{path}.total"] = total
+            inc[f"{path}.total_sq"] = total_sq
+        try:
+            get_collection(self.collection_name).update_one(
+                {"_id": self.version},
+                {"$inc": inc, "$set": {"updated_at": datetime.datetime.now(datetime.timezone.utc)}},
+                upsert=True,
+            )
+        except Exception as e:
+            # Counters are additive: keep them for the next flush
+            with self._lock:
+                for path, delta in pending.items():
+                    self._merge_pending(path, delta)
+            logger.warning(f"Failed to persist drift counts: {e}")
+
+    def close(self, timeout=5):
+        """Stop the flusher after writing the remaining counts."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def report(self):
+        """Drift over this process's traffic."""
+        with self._lock:
+            return self._report(self._features, self._score)
+
+    def combined_report(self):
+        """Drift over every worker's traffic for this model version (flushed every `flush_interval` seconds)."""
+        doc = get_collection(self.collection_name).find_one({"_id": self.version}) or {}
+        features = self._histograms()
+        for name, hist in features.items():
+            hist.add_persisted(doc.get('features', {}).get(name, {}))
+        score = _Histogram(self.reference['score'])
+        score.add_persisted(doc.get('score', {}))
+        return self._report(features, score)
+
+    def _report(self, feature_histograms, score_histogram):
+        features = {name: hist.report() for name, hist in feature_histograms.items()}
+        score = score_histogram.report()
+        if score['n']:
+            score['mean_proba_no_show'] = 1 - score['mean']
+        score['reference_mean_proba_no_show'] = self.reference.get('mean_proba_no_show')
+        score['reference_no_show_rate'] = self.reference.get('no_show_rate')
+        return {
+            'observations': score['n'],
+            'reference_rows': self.reference.get('rows'),
+            'features': features,
+            'score': score,
+            'drifted_features': sorted(n for n, r in features.items() if r.get('status') == 'alert'),
+        }
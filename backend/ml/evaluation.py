@@ -1,18 +1,205 @@
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+import numpy as np
+from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Points kept per stored precision/recall/ROC curve (the full sweep has one per distinct score)
+CURVE_POINTS = 101
+# Bootstrap resamples scored at once for AUC (rounds x test rows Poisson weights in memory)
+BOOTSTRAP_CHUNK_ELEMENTS = 4_000_000
+
+# Poisson(1) quantiles at 2**16 evenly spaced probabilities: indexing with random
+# uint16s draws bootstrap weights several times faster than Generator.poisson
+_POISSON_CDF = np.cumsum(np.exp(-1.0) / np.cumprod(np.r_[1.0, np.arange(1, 20)]))
+_POISSON_TABLE = np.searchsorted(_POISSON_CDF, (np.arange(2 ** 16) + 0.5) / 2 ** 16).astype(np.float32)
+
+def confusion_counts(y_true, y_pred):
+    """(tn, fp, fn, tp) for binary labels in one bincount pass."""
+    counts = np.bincount(2 * np.asarray(y_true, dtype=np.int64) + np.asarray(y_pred, dtype=np.int64), minlength=4)
+    tn, fp, fn, tp = (int(c) for c in counts[:4])
+    return tn, fp, fn, tp
+
 def evaluate_model(y_true, y_pred):
     """
     Compute Accuracy, Precision, Recall, F1
     """
     logger.info("Evaluating model...")
-    metrics = {
-        'accuracy': accuracy_score(y_true, y_pred),
-        'precision': precision_score(y_true, y_pred),
-        'recall': recall_score(y_true, y_pred),
-        'f1': f1_score(y_true, y_pred)
-    }
+    metrics = metrics_from_confusion(*confusion_counts(y_true, y_pred))
     logger.info(f"Metrics: {metrics}")
     return metrics
+
+def metrics_from_confusion(tn, fp, fn, tp):
+    """
+    Same metrics as evaluate_model, from (incrementally accumulated) confusion
+    counts. Undefined ratios are reported as 0, like sklearn's zero_division.
+    """
+    total = tn + fp + fn + tp
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'accuracy': (tp + tn) / total if total else 0.0,
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+    }
+
+# np.trapz was renamed to np.trapezoid in NumPy 2.0 (requirements allow 1.26)
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+def _ratio(num, den):
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+def _metrics_from_counts(counts):
+    """metrics_from_confusion over an (n, 4) array of (tn, fp, fn, tp) rows."""
+    tn, fp, fn, tp = (counts[:, i].astype(np.float64) for i in range(4))
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    return {
+        'accuracy': _ratio(tp + tn, tn + fp + fn + tp),
+        'precision': precision,
+        'recall': recall,
+        'f1': _ratio(2 * precision * recall, precision + recall),
+    }
+
+def threshold_sweep(y_true, scores):
+    """
+    Confusion counts at every distinct score threshold from one descending sort:
+    predicting positive for `score >= thresholds[i]` gives tp[i] / fp[i].
+    Returns (thresholds, tp, fp, positives, negatives).
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind='mergesort')
+    scores, y_sorted = scores[order], y_true[order]
+    # Last row of every run of equal scores
+    ends = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tp = np.cumsum(y_sorted)[ends]
+    fp = (ends + 1) - tp
+    positives = int(y_true.sum())
+    return scores[ends], tp, fp, positives, len(y_true) - positives
+
+def _curves(thresholds, tp, fp, positives, negatives):
+    precision = tp / (tp + fp)
+    recall = tp / positives if positives else np.zeros(len(tp))
+    fpr = fp / negatives if negatives else np.zeros(len(fp))
+    f1 = _ratio(2 * precision * recall, precision + recall)
+    # ROC from (0, 0); trapezoids handle tied scores
+    roc_auc = float(_trapezoid(np.r_[0.0, recall], np.r_[0.0, fpr])) if positives and negatives else None
+    # Step-wise average precision, as sklearn's average_precision_score
+    average_precision = float(np.sum(np.diff(np.r_[0.0, recall]) * precision)) if positives else None
+    return precision, recall, fpr, f1, roc_auc, average_precision
+
+def _downsample(n, points=CURVE_POINTS):
+    if n <= points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, points).round().astype(np.int64))
+
+def _bootstrap_auc(y_true, scores, rounds, rng):
+    """
+    ROC-AUC of `rounds` bootstrap resamples. The scores are sorted once and
+    each resample is a weighted rank statistic over the groups of tied
+    scores, evaluated for a chunk of resamples at a time. When there are few
+    distinct scores (trees) the per-group class counts are drawn exactly as a
+    multinomial; otherwise rows get Poisson(1) weights (the large-n limit of
+    the same resampling).
+    """
+    order = np.argsort(scores, kind='mergesort')
+    scores, positive = scores[order], y_true[order] == 1
+    starts = np.r_[0, np.flatnonzero(np.diff(scores)) + 1]
+    groups = len(starts)
+    exact = 2 * groups <= len(scores) // 2
+    if exact:
+        cells = np.r_[np.add.reduceat(positive, starts), np.add.reduceat(~positive, starts)]
+        cell_p = cells / len(scores)
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // (2 * groups if exact else len(scores)))
+    aucs = []
+    for done in range(0, rounds, chunk):
+        size = min(chunk, rounds - done)
+        if exact:
+            draws = rng.multinomial(len(scores), cell_p, size=size)
+            pos, neg = draws[:, :groups], draws[:, groups:]
+        else:
+            weights = _POISSON_TABLE[rng.integers(0, 2 ** 16, size=(size, len(scores)), dtype=np.uint16)]
+            pos, neg = weights * positive, weights * ~positive
+            if groups < len(scores):
+                pos = np.add.reduceat(pos, starts, axis=1)
+                neg = np.add.reduceat(neg, starts, axis=1)
+        # Negatives ranked strictly below each group, plus half the ties
+        below = np.cumsum(neg, axis=1, dtype=np.float64) - neg
+        pairs = pos.sum(axis=1) * neg.sum(axis=1)
+        auc = _ratio((pos * (below + 0.5 * neg)).sum(axis=1), pairs)
+        aucs.append(np.where(pairs > 0, auc, np.nan))
+    return np.concatenate(aucs)
+
+def bootstrap_intervals(counts, y_true=None, scores=None, rounds=None, confidence=0.95, seed=42):
+    """
+    Percentile bootstrap confidence intervals {metric: [low, high]}.
+
+    Resampling n rows with replacement only changes how many land in each
+    confusion cell, so the threshold metrics are drawn directly as
+    multinomial(n, cell proportions) counts: exact, and independent of n.
+    With `y_true`/`scores` the ROC-AUC interval is added as well.
+    """
+    rounds = rounds if rounds is not None else getattr(settings, "EVALUATION_BOOTSTRAP_ROUNDS", 1000)
+    if not rounds:
+        return {}
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return {}
+    rng = np.random.default_rng(seed)
+    tail = (1 - confidence) / 2 * 100
+    samples = _metrics_from_counts(rng.multinomial(total, counts / total, size=rounds))
+    if y_true is not None and scores is not None:
+        samples['roc_auc'] = _bootstrap_auc(np.asarray(y_true, dtype=np.int64), np.asarray(scores, dtype=np.float64), rounds, rng)
+    intervals = {}
+    for name, values in samples.items():
+        values = values[~np.isnan(values)]
+        if len(values):
+            intervals[name] = np.percentile(values, [tail, 100 - tail]).tolist()
+    return intervals
+
+def evaluate_predictions(y_true, y_pred=None, scores=None, threshold=0.5, bootstrap_rounds=None):
+    """
+    Full evaluation of one model's test predictions, for model_evaluation:
+
+    - metrics (as evaluate_model, plus roc_auc / average_precision when
+      `scores` = P(no-show) are given) and the confusion matrix, from one
+      bincount of the predictions (`y_pred`, default `scores > threshold`);
+    - threshold_sweep: precision / recall / F1 / FPR curves over all score
+      thresholds from a single sort, downsampled to CURVE_POINTS, and the
+      F1-optimal threshold;
+    - confidence_intervals from vectorized bootstrap resampling.
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    if y_pred is None:
+        y_pred = np.asarray(scores) > threshold
+    tn, fp, fn, tp = confusion_counts(y_true, y_pred)
+    metrics = metrics_from_confusion(tn, fp, fn, tp)
+    report = {'metrics': metrics, 'confusion_matrix': [[tn, fp], [fn, tp]]}
+
+    if scores is not None:
+        scores = np.asarray(scores, dtype=np.float64)
+        thresholds, sweep_tp, sweep_fp, positives, negatives = threshold_sweep(y_true, scores)
+        precision, recall, fpr, f1, roc_auc, average_precision = _curves(thresholds, sweep_tp, sweep_fp, positives, negatives)
+        metrics['roc_auc'] = roc_auc
+        metrics['average_precision'] = average_precision
+        best = int(np.argmax(f1))
+        keep = _downsample(len(thresholds))
+        report['threshold_sweep'] = {
+            'thresholds': thresholds[keep].tolist(),
+            'precision': precision[keep].tolist(),
+            'recall': recall[keep].tolist(),
+            'fpr': fpr[keep].tolist(),
+            'f1': f1[keep].tolist(),
+            'best_threshold': float(thresholds[best]),
+            'best_f1': float(f1[best]),
+        }
+    report['confidence_intervals'] = bootstrap_intervals(
+        [tn, fp, fn, tp],
+        y_true if scores is not None else None, scores,
+        rounds=bootstrap_rounds,
+    )
+    logger.info(f"Metrics: {metrics}")
+    return report
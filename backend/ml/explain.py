@@ -0,0 +1,130 @@
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _tree_leaf_contributions(tree, n_features, show_class=0):
+    """
+    Dense (n_nodes x n_features) table of tree-path contributions: row `node`
+    holds, per feature, the summed change in P(show) along the path from the
+    root to `node` (each split's change is attributed to its split feature).
+    A sample's explanation is simply the row of the leaf it lands in, so
+    explaining a batch is one `apply` plus a gather. Also returns the root
+    value (the tree's bias).
+    """
+    values = tree.value[:, 0, :]
+    values = values / values.sum(axis=1, keepdims=True)
+    p_show = values[:, show_class]
+
+    parent = np.full(tree.node_count, -1)
+    internal = np.flatnonzero(tree.children_left >= 0)
+    parent[tree.children_left[internal]] = internal
+    parent[tree.children_right[internal]] = internal
+
+    table = np.zeros((tree.node_count, n_features))
+    level = np.array([0])
+    # Walk down one depth level at a time, extending every parent's path sums
+    while len(level):
+        level = level[tree.children_left[level] >= 0]
+        children = np.concatenate([tree.children_left[level], tree.children_right[level]])
+        parents = parent[children]
+        table[children] = table[parents]
+        table[children, tree.feature[parents]] += p_show[children] - p_show[parents]
+        level = children
+    return table, p_show[0]
+
+
+class Explainer:
+    """
+    Per-feature contributions to P(show) for the supported model families:
+
+    - DecisionTree / RandomForest: tree-path contributions (bias = root value,
+      contributions sum to the predicted probability), precomputed per leaf so
+      a whole batch costs one `apply` plus array gathers.
+    - LogisticRegression / SGDClassifier(loss='log_loss'): coefficient x
+      feature value in log-odds of showing up (bias = intercept). Other linear
+      losses (e.g. modified_huber) get the same decomposition, labelled as
+      'decision_function' units since their scores are not log-odds.
+
+    Explanations are cached per feature vector in a bounded LRU.
+    """
+
+    def __init__(self, model, feature_names, cache_size=10000):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.show_class = int(np.flatnonzero(model.classes_ == 0)[0])
+        n_features = len(self.feature_names)
+
+        if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+            self.units = 'probability'
+            parts = [_tree_leaf_contributions(est.tree_, n_features, self.show_class) for est in model.estimators_]
+            self._tables = [table for table, _ in parts]
+            self._bias = float(np.mean([bias for _, bias in parts]))
+            self._kind = 'forest'
+        elif hasattr(model, 'tree_'):
+            self.units = 'probability'
+            table, self._bias = _tree_leaf_contributions(model.tree_, n_features, self.show_class)
+            self._tables = [table]
+            self._kind = 'tree'
+        elif hasattr(model, 'coef_'):
+            # LogisticRegression has no `loss`; an SGDClassifier is only a logistic model with log_loss
+            self.units = 'log_odds' if getattr(model, 'loss', 'log_loss') in ('log_loss', 'log') else 'decision_function'
+            # coef_ is for class 1 (no-show); flip the sign to explain showing up
+            sign = -1.0 if self.show_class == 0 else 1.0
+            self._coef = sign * model.coef_[0]
+            self._bias = float(sign * model.intercept_[0])
+            self._kind = 'linear'
+        else:
+            raise TypeError(f"Explanations are not supported for {type(model).__name__}")
+
+    def _compute(self, X):
+        if self._kind == 'linear':
+            return np.asarray(X, dtype=np.float64) * self._coef
+        leaves = self.model.apply(X).reshape(len(X), -1)  # (n_samples, n_trees)
+        result = np.zeros((len(X), len(self.feature_names)))
+        for t, table in enumerate(self._tables):
+            result += table[leaves[:, t]]
+        return result / len(self._tables)
+
+    def contributions(self, X):
+        """(n_samples, n_features) contribution array for a feature matrix or DataFrame, using the cache."""
+        values = np.ascontiguousarray(X, dtype=np.float64)
+        keys = [row.tobytes() for row in values]
+        result = np.empty_like(values)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    result[i] = cached
+        if missing:
+            # Keep DataFrames as-is so sklearn sees the feature names it was fitted with
+            computed = self._compute(X.iloc[missing] if hasattr(X, 'iloc') else values[missing])
+            result[missing] = computed
+            with self._lock:
+                for i, row in zip(missing, computed):
+                    self._cache[keys[i]] = row
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def explain(self, X):
+        """List of {base_value, units, contributions} dicts, one per row of X."""
+        contributions = self.contributions(X)
+        return [
+            {
+                'base_value': self._bias,
+                'units': self.units,
+                'contributions': dict(zip(self.feature_names, row.tolist())),
+            }
+            for row in contributions
+        ]
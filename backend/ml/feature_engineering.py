@@ -1,17 +1,17 @@
 import pandas as pd
 import numpy as np
-import pickle
 import logging
 from sklearn.preprocessing import StandardScaler, OneHotEncoder, LabelEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.model_selection import train_test_split
 from imblearn.over_sampling import SMOTE
-from django.conf import settings
-import os
 from db.mongo import get_collection
+from . import profiling
 
 logger = logging.getLogger(__name__)
 
+REFERENCE_SAMPLE_SIZE = 100000
+
 class FeatureEngineer:
     def __init__(self):
         self.scaler = StandardScaler()
@@ -65,32 +65,37 @@ class FeatureEngineer:
         X = df.drop('No-show', axis=1)
         y = df['No-show']
         
+        # Keep a sample of the real (pre-SMOTE) population as the drift-monitoring reference
+        self.reference_X = X.sample(n=min(len(X), REFERENCE_SAMPLE_SIZE), random_state=42)
+        self.reference_y = y.loc[self.reference_X.index]
+        
         logger.info(f"Class distribution before SMOTE: {y.value_counts().to_dict()}")
-        smote = SMOTE(random_state=42)
-        X_res, y_res = smote.fit_resample(X, y)
+        with profiling.stage("smote", rows_in=len(X)) as st:
+            smote = SMOTE(random_state=42)
+            X_res, y_res = smote.fit_resample(X, y)
+            st.rows_out = len(X_res)
         logger.info(f"Class distribution after SMOTE: {y_res.value_counts().to_dict()}")
         
-        # 6. Save Artifacts (Scalers, Encoders)
-        self._save_artifacts()
+        # 6. Artifacts (Scalers, Encoders) are saved with the model version by
+        # the registry, see artifacts()
         
         # 7. Persist to MongoDB
-        self._persist_features(X_res, y_res, list(X.columns))
+        with profiling.stage("persist_mongo", rows_in=len(X_res)) as st:
+            self._persist_features(X_res, y_res, list(X.columns))
+            st.rows_out = len(X_res)
 
         return X_res, y_res
 
-    def _save_artifacts(self):
-        models_dir = settings.BASE_DIR / 'models'
-        if not models_dir.exists():
-            models_dir.mkdir(parents=True)
-            
-        with open(models_dir / 'scaler.pkl', 'wb') as f:
-            pickle.dump(self.scaler, f)
-        with open(models_dir / 'neighbourhood_encoder.pkl', 'wb') as f:
-            pickle.dump(self.neighbourhood_encoder, f)
-        with open(models_dir / 'neighbourhood_mode.pkl', 'wb') as f:
-            pickle.dump(self.neighbourhood_mode, f)
-        
-        logger.info(f"Feature engineering artifacts saved to {models_dir}")
+    def artifacts(self):
+        """
+        Fitted preprocessing artifacts, saved by the model registry together
+        with the model so a version never mixes old and new transforms.
+        """
+        return {
+            'scaler': self.scaler,
+            'neighbourhood_encoder': self.neighbourhood_encoder,
+            'neighbourhood_mode': self.neighbourhood_mode,
+        }
 
     def _persist_features(self, X, y, feature_names):
         try:
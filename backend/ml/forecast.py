@@ -0,0 +1,69 @@
+import logging
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _summarize(grouped, z):
+    """
+    Expected no-shows and a normal-approximation interval per group.
+    The no-show count of independent appointments is Poisson-binomial:
+    mean = sum(p), variance = sum(p * (1 - p)).
+    """
+    agg = grouped.agg(
+        appointments=('p_no_show', 'size'),
+        expected_no_shows=('p_no_show', 'sum'),
+        variance=('variance', 'sum'),
+    )
+    margin = z * np.sqrt(agg['variance'])
+    agg['ci_low'] = (agg['expected_no_shows'] - margin).clip(lower=0)
+    agg['ci_high'] = np.minimum(agg['expected_no_shows'] + margin, agg['appointments'])
+    agg['expected_no_show_rate'] = agg['expected_no_shows'] / agg['appointments']
+    return agg
+
+
+def _records(agg):
+    return agg.reset_index().round(4).to_dict(orient='records')
+
+
+def forecast_schedule(predictor, appointments, confidence=0.95):
+    """
+    Score a whole schedule in one batch and aggregate the expected number of
+    no-shows overall, per neighbourhood, per day of week and per date.
+    All aggregation is done with vectorized group-bys.
+    """
+    df = appointments if isinstance(appointments, pd.DataFrame) else pd.DataFrame(appointments)
+    scored = predictor.predict_batch(df)
+
+    appointment_day = pd.to_datetime(df['AppointmentDay']).dt.normalize()
+    p_no_show = 1.0 - scored['probability'].to_numpy()
+    frame = pd.DataFrame({
+        'p_no_show': p_no_show,
+        'variance': p_no_show * (1.0 - p_no_show),
+        'Neighbourhood': df['Neighbourhood'].to_numpy(),
+        'day_of_week': appointment_day.dt.dayofweek.to_numpy(),
+        'date': appointment_day.dt.strftime('%Y-%m-%d').to_numpy(),
+    })
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    total = _summarize(frame.assign(_all='total').groupby('_all'), z).iloc[0]
+    by_day_of_week = _summarize(frame.groupby('day_of_week'), z)
+    by_day_of_week.index = pd.Index([DAY_NAMES[d] for d in by_day_of_week.index], name='day_of_week')
+
+    logger.info(f"Forecast for {len(frame)} appointments: {total['expected_no_shows']:.1f} expected no-shows")
+    return {
+        'appointments': int(total['appointments']),
+        'expected_no_shows': round(float(total['expected_no_shows']), 4),
+        'variance': round(float(total['variance']), 4),
+        'confidence': confidence,
+        'ci_low': round(float(total['ci_low']), 4),
+        'ci_high': round(float(total['ci_high']), 4),
+        'expected_no_show_rate': round(float(total['expected_no_show_rate']), 4),
+        'by_neighbourhood': _records(_summarize(frame.groupby('Neighbourhood'), z)),
+        'by_day_of_week': _records(by_day_of_week),
+        'by_date': _records(_summarize(frame.groupby('date'), z)),
+    }
@@ -1,46 +1,336 @@
 import pickle
 import os
+import json
+import uuid
+import shutil
+import hashlib
 import datetime
+import threading
+from contextlib import contextmanager
 from django.conf import settings
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
-MODELS_DIR = settings.BASE_DIR / 'models'
-
-def save_model(model, name="best_model"):
-    """
-    Save model to disk using pickle with timestamp versioning.
-    Also save as 'final_model.pkl' for easy loading.
-    """
-    if not MODELS_DIR.exists():
-        MODELS_DIR.mkdir(parents=True)
-        
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{name}_{timestamp}.pkl"
-    filepath = MODELS_DIR / filename
-    
-    with open(filepath, 'wb') as f:
-        pickle.dump(model, f)
-        
-    logger.info(f"Model saved to {filepath}")
-    
-    # Save as final_model.pkl (overwrite)
-    final_path = MODELS_DIR / 'final_model.pkl'
-    with open(final_path, 'wb') as f:
-        pickle.dump(model, f)
-    logger.info(f"Model updated at {final_path}")
-
-def load_model(name="final_model.pkl"):
-    """
-    Load model from disk.
-    """
-    filepath = MODELS_DIR / name
-    if not filepath.exists():
-        logger.warning(f"Model {name} not found.")
+MODELS_DIR = settings.MODELS_DIR
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = 'manifest.lock'
+VERSIONS_DIR = 'versions'
+DEFAULT_CHANNEL = 'global'
+
+# Preprocessing artifacts stored next to every model version
+PICKLED_ARTIFACTS = ('scaler', 'neighbourhood_encoder', 'neighbourhood_mode')
+JSON_ARTIFACTS = ('drift_reference',)
+
+_manifest_lock = threading.Lock()
+
+
+@contextmanager
+def _manifest_locked():
+    """
+    Exclusive access to the manifest for a read-modify-write. os.replace makes
+    each write atomic but not the read before it, so threads of this process
+    take `_manifest_lock` and processes sharing MODELS_DIR (API workers, the
+    training run) an flock on manifest.lock. Without fcntl (Windows) only the
+    thread lock is taken.
+    """
+    with _manifest_lock:
+        if fcntl is None:
+            yield
+            return
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        with open(MODELS_DIR / LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Layout:
+#   MODELS_DIR/manifest.json              {"current": {channel: version}, "versions": {version: entry}}
+#   MODELS_DIR/versions/<version>/model.pkl, scaler.pkl, ..., drift_reference.json
+# A version directory is complete before it is listed in the manifest, and the
+# manifest itself is replaced atomically, so "current" always points at a model
+# and the preprocessing artifacts it was trained with.
+
+
+class _HashingWriter:
+    """File wrapper that hashes everything written through it (pickle in one pass)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+
+def _manifest_path():
+    return MODELS_DIR / MANIFEST_FILE
+
+
+def _read_manifest():
+    path = _manifest_path()
+    if not path.exists():
+        return {'current': {}, 'versions': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest):
+    path = _manifest_path()
+    tmp_path = path.with_name(f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, default=_json_default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _json_default(value):
+    # numpy scalars in metrics / best_params
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _new_version():
+    # Microseconds plus a random suffix: segment models are saved many per second
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return f"{timestamp}_{uuid.uuid4().hex[:6]}"
+
+
+def save_model(model, name="best_model", artifacts=None, metrics=None, feature_order=None,
+               channel=DEFAULT_CHANNEL, activate=True, parent=None):
+    """
+    Save a model and its preprocessing artifacts as a new registry version.
+
+    The model is pickled exactly once (hashed while writing) into
+    versions/<version>/model.pkl; the manifest records version, hash, metrics,
+    feature order and artifact paths. With activate=True the channel's
+    "current" pointer is switched to the new version and old versions are
+    garbage-collected. `parent` records the version whose preprocessing
+    artifacts the model relies on (segment models share the global ones).
+    Returns the version id.
+    """
+    versions_root = MODELS_DIR / VERSIONS_DIR
+    versions_root.mkdir(parents=True, exist_ok=True)
+
+    version = _new_version()
+    staging_dir = versions_root / f".{version}.tmp"
+    staging_dir.mkdir()
+    try:
+        with open(staging_dir / 'model.pkl', 'wb') as f:
+            writer = _HashingWriter(f)
+            pickle.dump(model, writer)
+        paths = {'model': f"{VERSIONS_DIR}/{version}/model.pkl"}
+        for key, value in (artifacts or {}).items():
+            if value is None:
+                continue
+            if key in JSON_ARTIFACTS:
+                filename = f"{key}.json"
+                with open(staging_dir / filename, 'w') as f:
+                    json.dump(value, f, default=_json_default)
+            else:
+                filename = f"{key}.pkl"
+                with open(staging_dir / filename, 'wb') as f:
+                    pickle.dump(value, f)
+            paths[key] = f"{VERSIONS_DIR}/{version}/{filename}"
+        os.rename(staging_dir, versions_root / version)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    entry = {
+        'version': version,
+        'name': name,
+        'channel': channel,
+        'created_at': datetime.datetime.now().isoformat(),
+        'sha256': writer.sha256.hexdigest(),
+        'size_bytes': writer.size,
+        'metrics': metrics or {},
+        'feature_order': list(feature_order) if feature_order is not None else None,
+        'artifacts': paths,
+        'parent': parent,
+    }
+    with _manifest_locked():
+        manifest = _read_manifest()
+        manifest['versions'][version] = entry
+        if activate:
+            manifest['current'][channel] = version
+        _write_manifest(manifest)
+    logger.info(f"Model {name} saved as version {version} ({writer.size} bytes)")
+
+    if activate:
+        apply_retention()
+    return version
+
+
+def _check_servable(manifest, version, channel):
+    entry = manifest['versions'].get(version)
+    if entry is None:
+        raise KeyError(f"Unknown model version {version}")
+    if entry.get('channel', DEFAULT_CHANNEL) != channel:
+        raise ValueError(f"Model version {version} belongs to channel {entry.get('channel')}, not {channel}")
+    if channel == DEFAULT_CHANNEL:
+        # Segment versions reuse their parent's preprocessing; a global one must carry its own
+        missing = [key for key in PICKLED_ARTIFACTS if key not in entry['artifacts']]
+        if missing:
+            raise ValueError(f"Model version {version} has no {', '.join(missing)}")
+    return entry
+
+
+def check_servable(version, channel=DEFAULT_CHANNEL):
+    """
+    Manifest entry of `version` if it can serve `channel` on its own. Raises
+    KeyError for an unknown version and ValueError for one of another channel
+    (e.g. a segment model) or without its preprocessing artifacts.
+    """
+    return _check_servable(_read_manifest(), version, channel)
+
+
+def activate(version, channel=DEFAULT_CHANNEL):
+    """
+    Point `channel` at an existing version (promotion or instant rollback).
+    Raises like check_servable, before the pointer moves.
+    """
+    with _manifest_locked():
+        manifest = _read_manifest()
+        _check_servable(manifest, version, channel)
+        manifest['current'][channel] = version
+        _write_manifest(manifest)
+    logger.info(f"Channel {channel} now points at model version {version}")
+
+
+def deactivate(channel):
+    """Remove a channel's current pointer (its versions become eligible for retention)."""
+    with _manifest_locked():
+        manifest = _read_manifest()
+        if manifest['current'].pop(channel, None) is None:
+            return
+        _write_manifest(manifest)
+    logger.info(f"Channel {channel} deactivated")
+
+
+def current_entries(prefix=''):
+    """{channel: manifest entry} of the current version of every channel starting with `prefix`."""
+    manifest = _read_manifest()
+    return {
+        channel: manifest['versions'][version]
+        for channel, version in manifest['current'].items()
+        if channel.startswith(prefix) and version in manifest['versions']
+    }
+
+
+def list_versions(channel=None):
+    """Manifest entries, newest first, optionally restricted to one channel."""
+    manifest = _read_manifest()
+    entries = [e for e in manifest['versions'].values() if channel is None or e.get('channel') == channel]
+    current = set(manifest['current'].values())
+    for e in entries:
+        e['current'] = e['version'] in current
+    return sorted(entries, key=lambda e: e['version'], reverse=True)
+
+
+def get_current_version(channel=DEFAULT_CHANNEL):
+    return _read_manifest()['current'].get(channel)
+
+
+def apply_retention(keep=None):
+    """
+    Delete old versions, keeping the `keep` newest per channel (default
+    settings.MODEL_RETENTION) plus every version a channel currently points at.
+    """
+    keep = keep if keep is not None else getattr(settings, 'MODEL_RETENTION', 5)
+    with _manifest_locked():
+        manifest = _read_manifest()
+        current = set(manifest['current'].values())
+        by_channel = {}
+        for entry in manifest['versions'].values():
+            by_channel.setdefault(entry.get('channel', DEFAULT_CHANNEL), []).append(entry['version'])
+        removed = []
+        for versions in by_channel.values():
+            for version in sorted(versions, reverse=True)[keep:]:
+                if version not in current:
+                    removed.append(version)
+                    del manifest['versions'][version]
+        if not removed:
+            return []
+        _write_manifest(manifest)
+    # Files go only after the manifest no longer references them
+    for version in removed:
+        shutil.rmtree(MODELS_DIR / VERSIONS_DIR / version, ignore_errors=True)
+    logger.info(f"Retention removed {len(removed)} model version(s)")
+    return removed
+
+
+def _load_artifact(path):
+    if path.suffix == '.json':
+        with open(path) as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _load_legacy_bundle():
+    """Pre-registry layout: final_model.pkl and the preprocessing pickles at the top of MODELS_DIR."""
+    model_path = MODELS_DIR / 'final_model.pkl'
+    if not model_path.exists():
         return None
-        
-    with open(filepath, 'rb') as f:
-        model = pickle.load(f)
-    logger.info(f"Model loaded from {filepath}")
-    return model
+    bundle = {
+        'version': datetime.datetime.fromtimestamp(model_path.stat().st_mtime).strftime("%Y%m%d_%H%M%S"),
+        'entry': None,
+        'model': _load_artifact(model_path),
+    }
+    for key in PICKLED_ARTIFACTS:
+        path = MODELS_DIR / f"{key}.pkl"
+        bundle[key] = _load_artifact(path) if path.exists() else None
+    path = MODELS_DIR / 'drift_reference.json'
+    bundle['drift_reference'] = _load_artifact(path) if path.exists() else None
+    logger.info(f"Loaded legacy model from {model_path}")
+    return bundle
+
+
+def load_bundle(version=None, channel=DEFAULT_CHANNEL):
+    """
+    Load a model version together with its artifacts:
+    {'version', 'entry', 'model', 'scaler', 'neighbourhood_encoder', ...}.
+    Without `version`, loads whatever `channel` currently points at (falling
+    back to the legacy top-level files). Returns None if nothing is saved.
+    """
+    manifest = _read_manifest()
+    version = version or manifest['current'].get(channel)
+    if version is None:
+        if channel == DEFAULT_CHANNEL:
+            return _load_legacy_bundle()
+        return None
+    entry = manifest['versions'].get(version)
+    if entry is None:
+        raise KeyError(f"Unknown model version {version}")
+
+    bundle = {'version': version, 'entry': entry}
+    for key in ('model',) + PICKLED_ARTIFACTS + JSON_ARTIFACTS:
+        path = entry['artifacts'].get(key)
+        bundle[key] = _load_artifact(MODELS_DIR / path) if path else None
+    logger.info(f"Model version {version} loaded from {MODELS_DIR / VERSIONS_DIR / version}")
+    return bundle
+
+
+def load_model(version=None, channel=DEFAULT_CHANNEL):
+    """
+    Load a model from disk (a specific version, or the channel's current one).
+    """
+    bundle = load_bundle(version, channel)
+    if bundle is None:
+        logger.warning("No saved model found.")
+        return None
+    return bundle['model']
+
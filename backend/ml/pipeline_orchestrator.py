@@ -2,26 +2,74 @@ from .data_loader import load_data
 from .preprocessing import clean_data
 from .feature_engineering import FeatureEngineer
 from .training import train_models
+from .training_matrix import TrainingMatrix
+from .segments import train_segment_models
+from .streaming import train_out_of_core
+from .model_registry import get_current_version
+from django.conf import settings
+from . import profiling
 import logging
 
 logger = logging.getLogger(__name__)
 
-def run():
+def run(profiler=None):
+    """
+    Run the full training pipeline.
+    Every stage is timed by `profiler` (a default one is created if not given)
+    and the per-stage report is returned. A failing stage is recorded in the
+    profiler and its exception re-raised, so callers can report the run as failed.
+    """
     logger.info("Pipeline Orchestrator Started")
-    try:
-        # 1. Load Data
+    profiler = profiler or profiling.PipelineProfiler()
+    with profiling.activate(profiler):
+        try:
+            if settings.TRAINING_MODE == "streaming":
+                # Dataset larger than RAM: chunked passes, memory bounded by TRAINING_CHUNK_SIZE
+                train_out_of_core()
+                profiling.skip("segments")
+            else:
+                _run_in_memory()
+            
+            logger.info("Pipeline Finished Successfully")
+        except Exception as e:
+            logger.error(f"Pipeline Failed: {e}", exc_info=True)
+            raise
+    return profiler.report()
+
+
+def _run_in_memory():
+    """Load, clean and engineer the whole dataset in memory, then train (default mode)."""
+    # 1. Load Data
+    with profiling.stage("load") as st:
         df = load_data()
-        
-        # 2. Clean Data
+        st.rows_out = len(df)
+    
+    # 2. Clean Data
+    with profiling.stage("clean", rows_in=len(df)) as st:
         df = clean_data(df)
-        
-        # 3. Feature Engineering
+        st.rows_out = len(df)
+    
+    # 3. Feature Engineering
+    with profiling.stage("feature_engineering", rows_in=len(df)) as st:
         fe = FeatureEngineer()
         X, y = fe.process(df)
-        
-        # 4. Train & Evaluate & Save
-        train_models(X, y)
-        
-        logger.info("Pipeline Finished Successfully")
-    except Exception as e:
-        logger.error(f"Pipeline Failed: {e}", exc_info=True)
+        st.rows_out = len(X)
+        # float32 matrix in split order; the float64 frames are dropped
+        data = TrainingMatrix.from_frame(X, y)
+        del df, X, y
+    
+    # 4. Train & Evaluate & Save (model, preprocessing artifacts and
+    # drift reference go into one registry version)
+    with profiling.stage("train", rows_in=len(data)) as st:
+        best_model = train_models(data, artifacts=fe.artifacts(), reference=(fe.reference_X, fe.reference_y))
+        st.rows_out = len(data)
+    
+    # 5. Per-neighbourhood models on top of the global preprocessing
+    if settings.SEGMENT_MODELS_ENABLED:
+        with profiling.stage("segments", rows_in=len(data)) as st:
+            segments = train_segment_models(
+                data, best_model, fe.neighbourhood_encoder.classes_, get_current_version()
+            )
+            st.rows_out = len(segments)
+    else:
+        profiling.skip("segments")
@@ -0,0 +1,185 @@
+import atexit
+import datetime
+import logging
+import queue
+import random
+import threading
+import time
+from django.conf import settings
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+from db.mongo import get_collection
+
+logger = logging.getLogger(__name__)
+
+class PredictionLogger:
+    """
+    Write-behind audit log of predictions.
+
+    Request threads only do a non-blocking put on a bounded in-memory queue;
+    a background thread drains it and writes batches with unordered
+    `insert_many` once `batch_size` records are waiting or `flush_interval`
+    seconds have passed. A batch that fails with a connection error is
+    retried with exponential backoff until it is stored; meanwhile new
+    records wait in the queue. Only when the queue is full (Mongo slow or
+    down for long) are new records dropped and counted, so request latency
+    never depends on Mongo.
+    """
+
+    def __init__(self, collection_name="prediction_log", sample_rate=1.0, queue_size=10000,
+                 batch_size=500, flush_interval=2.0, retry_initial=0.5, retry_max=30.0):
+        self.collection_name = collection_name
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {"submitted": 0, "sampled_out": 0, "dropped": 0, "written": 0, "failed": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def should_log(self):
+        """Sampling decision; call before building a record so sampled-out rows cost nothing."""
+        if self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+            return True
+        self._count("sampled_out")
+        return False
+
+    def log(self, record):
+        """Queue one record. Never blocks; returns False if the queue is full and it was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="prediction-log-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+        # Drain whatever is left on shutdown
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self._write(batch)
+
+    def _collect_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(timeout, 0.5)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """
+        Insert `batch`, retrying connection failures with backoff. insert_many
+        sets every record's _id before sending, so a record that an earlier
+        attempt did store comes back as a duplicate key and is counted as
+        written. Other per-document errors (e.g. an invalid document) would
+        fail again on every retry, so those records are counted as failed.
+        """
+        pending, delay = batch, self.retry_initial
+        while pending:
+            try:
+                get_collection(self.collection_name).insert_many(pending, ordered=False)
+                self._count("written", len(pending))
+                return
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                duplicates = sum(1 for err in errors if err.get("code") == 11000)
+                rejected = len(errors) - duplicates
+                self._count("written", e.details.get("nInserted", 0) + duplicates)
+                if rejected:
+                    self._count("failed", rejected)
+                    logger.error(f"Prediction log rejected {rejected} record(s): {errors[0].get('errmsg')}")
+                return
+            except PyMongoError as e:
+                if not isinstance(e, ConnectionFailure) and not e.has_error_label("RetryableWriteError"):
+                    self._count("failed", len(pending))
+                    logger.error(f"Failed to write {len(pending)} prediction log records: {e}")
+                    return
+                self._count("retries")
+                logger.warning(f"Prediction log write failed, retrying in {delay:.1f}s: {e}")
+            except Exception as e:
+                # Not a database error (e.g. a record bson cannot encode): retrying would not help
+                self._count("failed", len(pending))
+                logger.error(f"Failed to write {len(pending)} prediction log records: {e}")
+                return
+            # Not interruptible by close(): its join timeout bounds shutdown
+            time.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+
+    def close(self, timeout=10):
+        """Stop the flusher after writing everything still queued."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        logger.info(f"Prediction log closed: {self.stats}")
+
+
+def build_record(inputs, features, probability, model_version):
+    """Document stored per prediction: raw inputs, model features, P(show) and model version."""
+    return {
+        "created_at": datetime.datetime.now(datetime.timezone.utc),
+        "model_version": model_version,
+        "inputs": inputs,
+        "features": features,
+        "probability": float(probability),
+        "will_show": bool(probability >= 0.5),
+    }
+
+
+_prediction_logger = None
+_logger_lock = threading.Lock()
+
+def get_prediction_logger():
+    """Process-wide PredictionLogger configured from settings, or None if disabled."""
+    global _prediction_logger
+    if not getattr(settings, "PREDICTION_LOG_ENABLED", True):
+        return None
+    if _prediction_logger is None:
+        with _logger_lock:
+            if _prediction_logger is None:
+                _prediction_logger = PredictionLogger(
+                    sample_rate=getattr(settings, "PREDICTION_LOG_SAMPLE_RATE", 1.0),
+                    queue_size=getattr(settings, "PREDICTION_LOG_QUEUE_SIZE", 10000),
+                    batch_size=getattr(settings, "PREDICTION_LOG_BATCH_SIZE", 500),
+                    flush_interval=getattr(settings, "PREDICTION_LOG_FLUSH_INTERVAL", 2.0),
+                )
+                atexit.register(_prediction_logger.close)
+    return _prediction_logger
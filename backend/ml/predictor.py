@@ -1,119 +1,546 @@
-import pickle
+import threading
+import time
+import datetime
+from typing import NamedTuple
+import numpy as np
 import pandas as pd
 import logging
 from django.conf import settings
-from .model_registry import load_model
+from .model_registry import load_bundle, list_versions, get_current_version, check_servable
+from .prediction_log import get_prediction_logger, build_record
+from .drift import DriftMonitor
+from .explain import Explainer
+from .segments import SegmentModelCache, current_segments
+from .shadow import ShadowScorer
 
 logger = logging.getLogger(__name__)
 
-class AppointmentPredictor:
-    def __init__(self):
-        self.model = None
-        self.scaler = None
-        self.neighbourhood_encoder = None
-        self.ready = False
-        self._load_resources()
-
-    def _load_resources(self):
+# Column order the models were trained on (FeatureEngineer output minus the target):
+# original CSV order after dropping IDs/dates, with waiting_time and
+# appointment_day_of_week appended. The order matters for sklearn!
+FEATURE_ORDER = ['Gender', 'Age', 'Neighbourhood', 'Hipertension', 'Diabetes', 'Alcoholism', 'Handcap', 'SMS_received', 'waiting_time', 'appointment_day_of_week']
+SCALE_COLS = ['Age', 'waiting_time', 'appointment_day_of_week']
+
+# Synthetic batches run through the full preprocessing + inference path before
+# a (re)loaded model starts serving: lazy imports, joblib pools and first-call
+# allocations are paid here instead of by the first real requests.
+WARMUP_BATCH_SIZES = (1, 32, 512)
+WARMUP_ROUNDS = 3
+
+
+def build_explainer(model):
+    if model is None:
+        return None
+    try:
+        return Explainer(model, FEATURE_ORDER, cache_size=getattr(settings, "EXPLANATION_CACHE_SIZE", 10000))
+    except TypeError as e:
+        logger.warning(f"Explanations disabled: {e}")
+        return None
+
+
+class LoadedModel(NamedTuple):
+    """
+    One model version with everything it is served with: preprocessing
+    artifacts, segment models, drift monitor and explainer. Immutable; the
+    predictor replaces its reference to one in a single assignment, so a
+    call that reads the reference once never pairs a model with another
+    version's scaler, encoder or segments.
+    """
+    version: str
+    model: object
+    scaler: object
+    neighbourhood_encoder: object
+    neighbourhood_mode: int = 0
+    drift_monitor: object = None
+    explainer: object = None
+    segment_cache: object = None
+    # Warm-up timings, set once the version has been warmed up
+    warmup: dict = None
+
+    @classmethod
+    def load(cls, version=None):
+        """Load a model version (default: the current one). Returns None if there is no usable model."""
         try:
-            self.model = load_model("final_model.pkl")
-            
-            models_dir = settings.BASE_DIR / 'models'
-            with open(models_dir / 'scaler.pkl', 'rb') as f:
-                self.scaler = pickle.load(f)
-            with open(models_dir / 'neighbourhood_encoder.pkl', 'rb') as f:
-                self.neighbourhood_encoder = pickle.load(f)
-            with open(models_dir / 'neighbourhood_mode.pkl', 'rb') as f:
-                self.neighbourhood_mode = pickle.load(f)
-                
+            bundle = load_bundle(version)
+            if bundle is None:
+                logger.warning("No trained model available yet.")
+                return None
+            if bundle['model'] is None:
+                return None
+            model_version = bundle['version']
+            reference = bundle['drift_reference']
+            segments = current_segments(model_version) if model_version else {}
+            loaded = cls(
+                version=model_version,
+                model=bundle['model'],
+                scaler=bundle['scaler'],
+                neighbourhood_encoder=bundle['neighbourhood_encoder'],
+                neighbourhood_mode=bundle['neighbourhood_mode'] if bundle['neighbourhood_mode'] is not None else 0,
+                drift_monitor=DriftMonitor(
+                    reference, model_version, flush_interval=getattr(settings, "DRIFT_FLUSH_SECONDS", 10.0),
+                ) if reference else None,
+                explainer=build_explainer(bundle['model']),
+                segment_cache=SegmentModelCache(segments, settings.SEGMENT_CACHE_SIZE) if segments else None,
+            )
             logger.info("Predictor resources loaded.")
-            self.ready = True
+            return loaded
         except Exception as e:
             logger.error(f"Failed to load predictor resources: {e}")
-            self.ready = False
-            self.model = None
+            return None
+
+    def _warmup_frame(self, rows, rng):
+        """Raw appointments shaped like validated API input, over the known neighbourhoods."""
+        today = pd.Timestamp.now(tz='UTC').normalize()
+        waits = rng.integers(0, 60, rows)
+        return pd.DataFrame({
+            'ScheduledDay': today - pd.to_timedelta(waits, unit='D'),
+            'AppointmentDay': today + pd.to_timedelta(rng.integers(0, 7, rows), unit='D'),
+            'Gender': rng.choice(['F', 'M'], rows),
+            'Neighbourhood': rng.choice(self.neighbourhood_encoder.classes_, rows),
+            'Hipertension': rng.integers(0, 2, rows),
+            'Diabetes': rng.integers(0, 2, rows),
+            'Alcoholism': rng.integers(0, 2, rows),
+            'Handcap': rng.integers(0, 2, rows),
+            'SMS_received': rng.integers(0, 2, rows),
+            'Age': rng.integers(0, 100, rows),
+        })
+
+    def warm_up(self):
+        """
+        Run synthetic batches through prepare_features, scoring and explanations.
+        Nothing is logged or fed to the drift monitor. Returns a copy carrying
+        the timings per batch size.
+        """
+        rng = np.random.default_rng(0)
+        started = time.perf_counter()
+        batches = {}
+        for batch_size in WARMUP_BATCH_SIZES:
+            timings = []
+            for _ in range(WARMUP_ROUNDS):
+                batch_started = time.perf_counter()
+                X_input, known = self.prepare_features(self._warmup_frame(batch_size, rng))
+                self.predict_proba_show(X_input, known)
+                if self.explainer is not None:
+                    self.explain(X_input.iloc[:1], known[:1])
+                timings.append(time.perf_counter() - batch_started)
+            batches[str(batch_size)] = {
+                'first_ms': round(timings[0] * 1000, 3),
+                'last_ms': round(timings[-1] * 1000, 3),
+            }
+        return self._replace(warmup={
+            'seconds': time.perf_counter() - started,
+            'finished_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'batches': batches,
+        })
+
+    def _encode_neighbourhood(self, values):
+        """
+        Vectorized LabelEncoder.transform that maps unseen neighbourhoods
+        to the training mode instead of raising. Returns (codes, known mask).
+        """
+        classes = self.neighbourhood_encoder.classes_
+        values = np.asarray(values, dtype=object)
+        idx = np.clip(np.searchsorted(classes, values), 0, len(classes) - 1)
+        known = classes[idx] == values
+        return np.where(known, idx, self.neighbourhood_mode), known
+
+    def prepare_features(self, data):
+        """
+        Turn raw appointment records (list of dicts or DataFrame) into the
+        model's feature matrix, applying the same steps as FeatureEngineer.
+        Returns (features, known): `known` marks the rows whose neighbourhood
+        was seen in training. The others are encoded as the training mode and
+        are always scored by the global model.
+        """
+        df = pd.DataFrame(data) if not isinstance(data, pd.DataFrame) else data.copy()
+
+        # 1. Date Features
+        scheduled = pd.to_datetime(df['ScheduledDay']).dt.normalize()
+        appointment = pd.to_datetime(df['AppointmentDay']).dt.normalize()
+        df['waiting_time'] = (appointment - scheduled).dt.days.clip(lower=0) # No negative wait
+        df['appointment_day_of_week'] = appointment.dt.dayofweek
+
+        # 2. Encoding
+        df['Gender'] = df['Gender'].map({'F': 0, 'M': 1})
+        df['Neighbourhood'], known = self._encode_neighbourhood(df['Neighbourhood'])
+
+        # 3. Scaling
+        df[SCALE_COLS] = self.scaler.transform(df[SCALE_COLS])
+
+        # 4. Reorder columns to match training
+        for col in FEATURE_ORDER:
+            if col not in df.columns:
+                df[col] = 0 # Default?
+        return df[FEATURE_ORDER], known
+
+    def route(self, X_input, known):
+        """
+        Split rows by the model that serves them. Returns a list of
+        (row positions, neighbourhood or None, model); unknown neighbourhoods
+        and rows without a loadable segment model go to the global model
+        (neighbourhood None).
+        """
+        cache, global_model = self.segment_cache, self.model
+        if cache is None:
+            return [(np.arange(len(X_input)), None, global_model)]
+        codes = X_input['Neighbourhood'].to_numpy().astype(int)
+        classes = self.neighbourhood_encoder.classes_
+        groups = []
+        remaining = np.ones(len(codes), dtype=bool)
+        for code in np.unique(codes[known]):
+            model = cache.get(classes[code])
+            if model is not None:
+                rows = np.flatnonzero((codes == code) & known)
+                groups.append((rows, classes[code], model))
+                remaining[rows] = False
+        if remaining.any():
+            groups.append((np.flatnonzero(remaining), None, global_model))
+        return groups
+
+    def predict_proba_show(self, X_input, known):
+        """P(show) per row, each row scored by its segment model or the global one."""
+        groups = self.route(X_input, known)
+        if len(groups) == 1:
+            return groups[0][2].predict_proba(X_input)[:, 0]
+        proba_show = np.empty(len(X_input))
+        for rows, _, model in groups:
+            proba_show[rows] = model.predict_proba(X_input.iloc[rows])[:, 0]
+        return proba_show
+
+    def explain(self, X_input, known):
+        """Explanations from the model that actually scores each row."""
+        explanations = [None] * len(X_input)
+        for rows, neighbourhood, _ in self.route(X_input, known):
+            explainer = self.explainer if neighbourhood is None else \
+                self.segment_cache.explainer(neighbourhood, build_explainer)
+            if explainer is None:
+                raise RuntimeError("Explanations are not available for the loaded model")
+            for i, explanation in zip(rows, explainer.explain(X_input.iloc[rows])):
+                explanations[i] = explanation
+        return explanations
+
+
+class AppointmentPredictor:
+    """
+    The serving predictor. Everything it serves with is one LoadedModel in
+    `self._loaded`, swapped whole by reload(); every prediction reads that
+    reference once at the start and uses it throughout.
+    """
+
+    def __init__(self, load=True):
+        self._loaded = None
+        self.shadow = None
+        # Challenger versions set through the API; None means settings.SHADOW_CHALLENGERS
+        self.challenger_versions = None
+        self._reload_lock = threading.Lock()
+        self._warmup_thread = None
+        self._watch_thread = None
+        if load:
+            self.reload()
+
+    # Read-only views of the serving snapshot
+    @property
+    def ready(self):
+        """True once a model is loaded and warmed up; the API returns 503 until then."""
+        return self._loaded is not None
+
+    @property
+    def model(self):
+        return self._loaded.model if self._loaded is not None else None
+
+    @property
+    def model_version(self):
+        return self._loaded.version if self._loaded is not None else None
+
+    @property
+    def drift_monitor(self):
+        return self._loaded.drift_monitor if self._loaded is not None else None
+
+    @property
+    def explainer(self):
+        return self._loaded.explainer if self._loaded is not None else None
+
+    @property
+    def segment_cache(self):
+        return self._loaded.segment_cache if self._loaded is not None else None
+
+    def reload(self, if_changed=False):
+        """
+        Load the current model version and its artifacts (e.g. after a retrain
+        or rollback), warm it up, and only then swap it in, so requests never
+        hit a cold model or a new model paired with an old scaler. The previous
+        model keeps serving meanwhile and stays in place if loading fails. With
+        if_changed=True nothing is loaded when the current version is already
+        serving. Returns True if a model is serving.
+        """
+        with self._reload_lock:
+            if if_changed and self.ready and get_current_version() in (None, self.model_version):
+                return True
+            staged = LoadedModel.load()
+            if staged is None:
+                return self.ready
+            try:
+                staged = staged.warm_up()
+            except Exception as e:
+                logger.error(f"Predictor warm-up failed, keeping the current model: {e}")
+                return self.ready
+            shadow = self._build_shadow(staged.version)
+
+            previous, self._loaded = self._loaded, staged
+            self._swap_shadow(shadow)
+            if previous is not None and previous.drift_monitor is not None:
+                # Flush its last counts; the new version starts its own
+                previous.drift_monitor.close()
+            logger.info(f"Model {staged.version} warmed up in {staged.warmup['seconds']:.2f}s and serving")
+            return True
+
+    def reload_in_background(self):
+        """reload() in a daemon thread, for request handlers; the current model keeps serving meanwhile."""
+        thread = threading.Thread(target=self.reload, name='predictor-reload', daemon=True)
+        thread.start()
+        return thread
 
-    def predict(self, data: dict):
+    def _resolve_challengers(self, champion_version):
+        """
+        Challenger versions to shadow: the API override or SHADOW_CHALLENGERS.
+        "latest" stands for the newest global version that is not the champion
+        (a retrain saved without activation, or the model before a rollback).
+        """
+        requested = self.challenger_versions
+        if requested is None:
+            requested = getattr(settings, "SHADOW_CHALLENGERS", [])
+        versions = []
+        for version in requested:
+            if version == 'latest':
+                candidates = [e['version'] for e in list_versions('global') if e['version'] != champion_version]
+                version = candidates[0] if candidates else None
+            if version and version != champion_version and version not in versions:
+                versions.append(version)
+        return versions
+
+    def _build_shadow(self, champion_version):
+        """ShadowScorer with every challenger loaded, or None if there are none."""
+        challengers = {}
+        for version in self._resolve_challengers(champion_version):
+            try:
+                check_servable(version)
+            except (KeyError, ValueError) as e:
+                # e.g. a segment version in SHADOW_CHALLENGERS; the API rejects those up front
+                logger.warning(f"Shadow challenger {version} skipped: {e}")
+                continue
+            challenger = LoadedModel.load(version)
+            if challenger is not None:
+                challengers[version] = challenger
+            else:
+                logger.warning(f"Shadow challenger {version} could not be loaded, skipping it")
+        if not challengers:
+            return None
+        logger.info(f"Shadow scoring {sorted(challengers)} against champion {champion_version}")
+        return ShadowScorer(
+            champion_version, challengers,
+            queue_rows=getattr(settings, "SHADOW_QUEUE_ROWS", 50000),
+            batch_size=getattr(settings, "SHADOW_BATCH_SIZE", 256),
+            workers=getattr(settings, "SHADOW_WORKERS", 1),
+            sample_rate=getattr(settings, "SHADOW_SAMPLE_RATE", 1.0),
+        )
+
+    def _swap_shadow(self, shadow):
+        previous, self.shadow = self.shadow, shadow
+        if previous is not None:
+            previous.close()
+
+    def set_challengers(self, versions):
+        """Shadow-score `versions` against the serving model from now on (None: back to settings)."""
+        self.challenger_versions = list(versions) if versions is not None else None
+        return self._rebuild_shadow()
+
+    def set_challengers_in_background(self, versions):
+        """
+        set_challengers() with the challengers loaded in a daemon thread, for
+        request handlers. The selection is recorded first, so of two quick
+        calls the later one wins whichever thread gets the lock first.
+        """
+        self.challenger_versions = list(versions) if versions is not None else None
+        thread = threading.Thread(target=self._rebuild_shadow, name='predictor-challengers', daemon=True)
+        thread.start()
+        return thread
+
+    def _rebuild_shadow(self):
+        with self._reload_lock:
+            self._swap_shadow(self._build_shadow(self.model_version) if self.ready else None)
+            return self.shadow
+
+    def start_warmup(self, retry_seconds=None):
+        """
+        Load and warm up in a background thread. Until a model exists (first
+        deployment, training still running) the load is retried every
+        `retry_seconds`; the request path never loads anything itself.
+        """
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            return
+        retry_seconds = retry_seconds or getattr(settings, "WARMUP_RETRY_SECONDS", 30)
+
+        def run():
+            while not self.ready and not self.reload():
+                time.sleep(retry_seconds)
+
+        self._warmup_thread = threading.Thread(target=run, name='predictor-warmup', daemon=True)
+        self._warmup_thread.start()
+        self.start_registry_watch()
+
+    def start_registry_watch(self, interval=None):
+        """
+        Check the registry's current pointer every `interval` seconds and
+        reload when it has moved, so a rollback or retrain done through
+        another worker process reaches this one too. A version that fails to
+        load is not retried until the pointer moves again. 0 disables.
+        """
+        interval = interval if interval is not None else getattr(settings, "MODEL_WATCH_SECONDS", 30)
+        if not interval or (self._watch_thread is not None and self._watch_thread.is_alive()):
+            return
+
+        def run():
+            failed = None
+            while True:
+                time.sleep(interval)
+                try:
+                    current = get_current_version()
+                    if not self.ready or current in (None, self.model_version, failed):
+                        continue
+                    logger.info(f"Registry now points at model version {current}, reloading")
+                    self.reload(if_changed=True)
+                    failed = current if self.model_version != current else None
+                except Exception as e:
+                    logger.warning(f"Model registry check failed: {e}")
+
+        self._watch_thread = threading.Thread(target=run, name='predictor-registry-watch', daemon=True)
+        self._watch_thread.start()
+
+    def status(self):
+        """Readiness details for the health endpoint."""
+        loaded = self._loaded
+        return {
+            'ready': loaded is not None,
+            'model_version': loaded.version if loaded is not None else None,
+            'warming_up': self._warmup_thread is not None and self._warmup_thread.is_alive(),
+            'warmup': loaded.warmup if loaded is not None else None,
+        }
+
+    def prepare_features(self, data):
+        """LoadedModel.prepare_features with the serving model: (features, known mask)."""
+        loaded = self._loaded
+        if loaded is None:
+            raise RuntimeError("Model not loaded")
+        return loaded.prepare_features(data)
+
+    def predict_batch(self, data):
+        """
+        Vectorized prediction for many appointments at once.
+        Returns a DataFrame with `will_show` and `probability` (of showing up) per row.
+        """
+        loaded = self._loaded
+        if loaded is None:
+            raise RuntimeError("Model not loaded")
+        X_input, known = loaded.prepare_features(data)
+        proba_show = loaded.predict_proba_show(X_input, known)
+        self._observe(loaded, data, X_input, known, proba_show)
+        return pd.DataFrame({
+            'will_show': proba_show >= 0.5,
+            'probability': proba_show,
+        }, index=X_input.index)
+
+    def explain_batch(self, data):
+        """
+        Per-feature contributions to P(show) for many appointments at once.
+        Returns one {base_value, units, contributions} dict per row.
+        """
+        loaded = self._loaded
+        if loaded is None or loaded.explainer is None:
+            raise RuntimeError("Explanations are not available for the loaded model")
+        return loaded.explain(*loaded.prepare_features(data))
+
+    def _observe(self, loaded, data, X_input, known, proba_show):
+        """Post-prediction hooks: drift monitoring, the audit log and shadow scoring. Never raises."""
+        if loaded.drift_monitor is not None:
+            try:
+                loaded.drift_monitor.update(X_input, proba_show, known)
+            except Exception as e:
+                logger.warning(f"Failed to update drift monitor: {e}")
+        self._log_predictions(data, X_input, proba_show, loaded.version)
+        shadow = self.shadow
+        if shadow is not None:
+            try:
+                shadow.submit(data, proba_show)
+            except Exception as e:
+                logger.warning(f"Failed to queue shadow scoring: {e}")
+
+    def _log_predictions(self, data, X_input, proba_show, model_version):
+        """Hand sampled predictions to the write-behind log; never raises."""
+        prediction_logger = get_prediction_logger()
+        if prediction_logger is None:
+            return
+        try:
+            rows = [i for i in range(len(X_input)) if prediction_logger.should_log()]
+            if not rows:
+                return
+            if isinstance(data, pd.DataFrame):
+                inputs = data.iloc[rows].to_dict(orient='records')
+            else:
+                inputs = [dict(data[i]) for i in rows]
+            features = X_input.iloc[rows].to_dict(orient='records')
+            for i, raw, feats in zip(rows, inputs, features):
+                prediction_logger.log(build_record(raw, feats, proba_show[i], model_version))
+        except Exception as e:
+            logger.warning(f"Failed to log predictions: {e}")
+
+    def predict(self, data: dict, explain=False):
         """
         Accepts dictionary input, preprocesses, and predicts.
-        Input keys: ScheduledDay, AppointmentDay, Gender, Neighbourhood, 
+        With explain=True the result also carries per-feature contributions.
+        Input keys: ScheduledDay, AppointmentDay, Gender, Neighbourhood,
                     Scholarship, Hipertension, Diabetes, Alcoholism, Handcap, SMS_received, Age
         """
-        if not self.model:
-            self._load_resources()
-            if not self.model:
-                return {"error": "Model not loaded"}
+        loaded = self._loaded
+        if loaded is None:
+            # Loading happens in reload() / the warm-up thread, never on the request path
+            return {"error": "Model not loaded"}
 
         try:
-            # Create DataFrame
-            df = pd.DataFrame([data])
-            
-            # Preprocessing (Same steps as FeatureEngineer)
-            # 1. Date Features
-            df['ScheduledDay'] = pd.to_datetime(df['ScheduledDay']).dt.normalize()
-            df['AppointmentDay'] = pd.to_datetime(df['AppointmentDay']).dt.normalize()
-            
-            df['waiting_time'] = (df['AppointmentDay'] - df['ScheduledDay']).dt.days
-            df['waiting_time'] = df['waiting_time'].apply(lambda x: max(0, x))
-            df['appointment_day_of_week'] = df['AppointmentDay'].dt.dayofweek
-            
-            # 2. Encoding
-            df['Gender'] = df['Gender'].map({'F': 0, 'M': 1})
-            
-            # Handle unknown neighbourhood? 
-            # If label encoder sees new label, it errors.
-            # We should handle it.
-            try:
-                df['Neighbourhood'] = self.neighbourhood_encoder.transform(df['Neighbourhood'])
-            except ValueError:
-                # Fallback to mode (most frequent from training)
-                if hasattr(self, 'neighbourhood_mode'):
-                    df['Neighbourhood'] = self.neighbourhood_mode
-                else:
-                    df['Neighbourhood'] = 0 # Safety net
-            
-            # 3. Scaling
-            scale_cols = ['Age', 'waiting_time', 'appointment_day_of_week']
-            df[scale_cols] = self.scaler.transform(df[scale_cols])
-            
-            # 4. Reorder columns to match training
-            # Columns: Gender, Age, Neighbourhood, Scholarship, Hipertension, Diabetes, Alcoholism, Handcap, SMS_received, waiting_time, appointment_day_of_week
-            # Note: training data was X (dropped PatientId, AppointmentID, ScheduledDay, AppointmentDay, No-show).
-            # The order matters for sklearn!
-            # We need to ensure correct column order.
-            # Ideally FeatureEngineer should expose the feature names.
-            # Hardcoding for now based on training step:
-            # The df passed to smote had: Gender, Age, Neighbourhood, Scholarship, Hipertension, Diabetes, Alcoholism, Handcap, SMS_received, waiting_time, appointment_day_of_week
-            # (order depends on how columns were in original DF + new columns appended).
-            # Original: Gender, ScheduledDay, AppointmentDay, Age, Neighbourhood, Scholarship, Hipertension, Diabetes, Alcoholism, Handcap, SMS_received, No-show
-            # Transformations:
-            # drop ScheduledDay, AppointmentDay
-            # waiting_time, appointment_day_of_week added.
-            # So: Gender, Age, Neighbourhood, Hipertension, Diabetes, Alcoholism, Handcap, SMS_received, waiting_time, appointment_day_of_week
-            # Let's expect this order.
-            
-            feature_order = ['Gender', 'Age', 'Neighbourhood', 'Hipertension', 'Diabetes', 'Alcoholism', 'Handcap', 'SMS_received', 'waiting_time', 'appointment_day_of_week']
-            
-            # Ensure all cols exist
-            for col in feature_order:
-                if col not in df.columns:
-                    df[col] = 0 # Default?
-            
-            X_input = df[feature_order]
-            
-            # Predict
-            prediction = self.model.predict(X_input)[0]
-            probability = self.model.predict_proba(X_input)[0].tolist()
-            
-            result = "No-show" if prediction == 1 else "Show"
-            
+            X_input, known = loaded.prepare_features([data])
+
+            # Predict (segment model if this neighbourhood has one, else global);
+            # argmax of two classes == P(show) >= 0.5, ties going to "show"
+            probability = float(loaded.predict_proba_show(X_input, known)[0])
+            self._observe(loaded, [data], X_input, known, [probability])
+
             # Lean Response with percentage
-            return {
-                "will_show": bool(prediction == 0),
-                "probability": probability[0], # Probability of showing up
-                "probability_percentage": round(probability[0] * 100, 2)
+            result = {
+                "will_show": probability >= 0.5,
+                "probability": probability, # Probability of showing up
+                "probability_percentage": round(probability * 100, 2)
             }
-            
+            if explain and loaded.explainer is not None:
+                result["explanation"] = loaded.explain(X_input, known)[0]
+            return result
+
         except Exception as e:
             logger.error(f"Prediction failed: {e}")
             return {"error": str(e)}
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    """
+    Process-wide predictor shared by the API and the training pipeline.
+    Created empty: nothing is loaded until start_warmup() (called by
+    core.startup.start_predictor_warmup from the WSGI/ASGI entry points) or
+    reload() runs, so importing the API in a management command loads no model.
+    """
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = AppointmentPredictor(load=False)
+    return _predictor
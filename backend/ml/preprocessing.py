@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import logging
 from db.mongo import get_collection
+from . import profiling
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +70,13 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     logger.info(f"Removed {old_len - len(df)} outliers based on Age.")
     
     # 5. Persist to MongoDB
+    with profiling.stage("persist_mongo", rows_in=len(df)) as st:
+        _persist_cleaned_data(df)
+        st.rows_out = len(df)
+    
+    return df
+
+def _persist_cleaned_data(df: pd.DataFrame):
     try:
         collection = get_collection("cleaned_data")
         # Convert to records logic: delete old, insert new?
@@ -84,5 +92,3 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
         logger.info("Cleaned data persisted to MongoDB.")
     except Exception as e:
         logger.error(f"Failed to persist cleaned data: {e}")
-    
-    return df
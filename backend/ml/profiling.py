@@ -0,0 +1,392 @@
+import cProfile
+import datetime
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Relative cost of each top-level stage, used to turn stage completion into
+# a percentage / ETA. Roughly matches where the retrain budget goes on the
+# Kaggle dataset (training dominates).
+DEFAULT_STAGE_WEIGHTS = {
+    'load': 5,
+    'clean': 10,
+    'feature_engineering': 25,
+    'train': 60,
+    'segments': 15,  # optional, see skip()
+}
+
+RSS_SAMPLE_INTERVAL = 0.05  # seconds
+# The sampler also sleeps at least this many times as long as a sample took, so
+# reading /proc (a full scan on kernels without task/*/children) stays around
+# 5% of one core however many processes the host runs
+RSS_SAMPLE_BACKOFF = 20
+
+_active = None
+
+
+def _current_rss_bytes():
+    """Resident set size of this process, best effort across platforms."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is KB on Linux, bytes on macOS. Only a peak, but better than nothing.
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if os.uname().sysname == 'Darwin' else maxrss * 1024
+    return 0
+
+
+def _read_stat(pid, ticks, page):
+    """(ppid, cpu_seconds, rss_bytes) from /proc/<pid>/stat."""
+    with open(f'/proc/{pid}/stat') as f:
+        # Fields after the parenthesised command name, which may contain spaces
+        fields = f.read().rsplit(')', 1)[1].split()
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / ticks, int(fields[21]) * page
+
+
+def _has_proc_children():
+    # /proc/<pid>/task/<tid>/children needs CONFIG_PROC_CHILDREN
+    return os.path.exists(f'/proc/{os.getpid()}/task/{os.getpid()}/children')
+
+
+def _proc_children(pid):
+    children = []
+    try:
+        tasks = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return children
+    for tid in tasks:
+        try:
+            with open(f'/proc/{pid}/task/{tid}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue  # thread or process exited
+    return children
+
+
+def _descendant_stats():
+    """
+    {pid: (cpu_seconds, rss_bytes)} for this process and its live descendants
+    (Linux without psutil). Only the descendants' /proc entries are read when
+    the kernel lists children; otherwise every process is scanned once.
+    """
+    ticks, page = os.sysconf('SC_CLK_TCK'), os.sysconf('SC_PAGE_SIZE')
+    me = os.getpid()
+    stats = {}
+    if _has_proc_children():
+        pending = [me]
+        while pending:
+            pid = pending.pop()
+            try:
+                stats[pid] = _read_stat(pid, ticks, page)[1:]
+            except OSError:
+                continue
+            pending.extend(_proc_children(pid))
+        return stats
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            ppid, cpu, rss = _read_stat(entry, ticks, page)
+        except OSError:
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+        stats[int(entry)] = (cpu, rss)
+    tree = {}
+    pending = [me]
+    while pending:
+        pid = pending.pop()
+        if pid in stats:
+            tree[pid] = stats[pid]
+        pending.extend(parents.get(pid, []))
+    return tree
+
+
+def _tree_usage():
+    """
+    (cpu_seconds, child_cpu_seconds, rss_bytes) of this process plus all its
+    descendants. GridSearchCV(n_jobs=-1) and joblib Parallel fit in loky worker
+    processes, so the process alone would miss most of the training cost.
+    child_cpu_seconds covers live descendants and reaped children. RSS is
+    summed over processes (pages shared with workers, e.g. memmapped
+    arrays, are counted once per process). Falls back to this process only.
+    """
+    own_cpu = time.process_time()
+    try:
+        import psutil
+        me = psutil.Process()
+        times = me.cpu_times()
+        child_cpu, rss = times.children_user + times.children_system, me.memory_info().rss
+        for child in me.children(recursive=True):
+            try:
+                child_times = child.cpu_times()
+                child_cpu += child_times.user + child_times.system
+                rss += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return own_cpu, child_cpu, rss
+    except ImportError:
+        pass
+    try:
+        stats = _descendant_stats()
+        me = os.getpid()
+        rss = stats.pop(me)[1]
+        child_cpu = sum(cpu for cpu, _ in stats.values())
+        rss += sum(child_rss for _, child_rss in stats.values())
+        if resource is not None:
+            reaped = resource.getrusage(resource.RUSAGE_CHILDREN)
+            child_cpu += reaped.ru_utime + reaped.ru_stime
+        return own_cpu, child_cpu, rss
+    except (OSError, KeyError, ValueError, AttributeError):
+        return own_cpu, 0.0, _current_rss_bytes()
+
+
+class Stage:
+    """A single timed pipeline stage. Callers set `rows_out` before leaving the block."""
+
+    def __init__(self, name, rows_in=None, depth=0):
+        self.name = name
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.child_cpu_seconds = None
+        self.peak_rss_bytes = 0
+        self.profile_path = None
+        self.error = None
+        self._wall_start = None
+        self._cpu_start = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'wall_seconds': round(self.wall_seconds, 4) if self.wall_seconds is not None else None,
+            'cpu_seconds': round(self.cpu_seconds, 4) if self.cpu_seconds is not None else None,
+            'child_cpu_seconds': round(self.child_cpu_seconds, 4) if self.child_cpu_seconds is not None else None,
+            'peak_rss_mb': round(self.peak_rss_bytes / (1024 * 1024), 2),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'profile_path': self.profile_path,
+            'error': self.error,
+        }
+
+
+class _NullStage(Stage):
+    """Returned by `stage()` when no profiler is active, so call sites need no checks."""
+
+    def __init__(self):
+        super().__init__('noop')
+
+
+class PipelineProfiler:
+    """
+    Records wall time, CPU time, peak RSS and row counts for every pipeline stage
+    and reports live progress (current stage, percent, ETA) via `on_progress`.
+    CPU time and RSS include worker processes (joblib / GridSearchCV), see
+    _tree_usage. If `profile_dir` is set, each top-level stage is also run
+    under cProfile and dumped as `<run_id>_<stage>.prof`; cProfile only sees
+    this process, so for parallel stages the profile shows joblib waiting on
+    its workers, not the fits themselves.
+    """
+
+    def __init__(self, on_progress=None, profile_dir=None, stage_weights=None):
+        self.run_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.on_progress = on_progress
+        self.profile_dir = profile_dir
+        self.stage_weights = dict(stage_weights or DEFAULT_STAGE_WEIGHTS)
+        self.total_weight = float(sum(self.stage_weights.values())) or 1.0
+        self.stages = []
+        self._stack = []
+        self._done_weight = 0.0
+        self._current_fraction = 0.0
+        self._start = None
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._sampling = threading.Event()
+
+    # ---- lifecycle -------------------------------------------------------
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._sampling.set()
+        self._sampler = threading.Thread(target=self._sample_rss, name='rss-sampler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._sampling.clear()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+            self._sampler = None
+
+    def _sample_rss(self):
+        while self._sampling.is_set():
+            started = time.perf_counter()
+            rss = _tree_usage()[2]
+            with self._lock:
+                for st in self._stack:
+                    if rss > st.peak_rss_bytes:
+                        st.peak_rss_bytes = rss
+            time.sleep(max(RSS_SAMPLE_INTERVAL, (time.perf_counter() - started) * RSS_SAMPLE_BACKOFF))
+
+    # ---- stages ----------------------------------------------------------
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        with self._lock:
+            parent = self._stack[-1] if self._stack else None
+            full_name = f"{parent.name}.{name}" if parent else name
+            st = Stage(full_name, rows_in=rows_in, depth=len(self._stack))
+            st.peak_rss_bytes = _tree_usage()[2]
+            self._stack.append(st)
+            self.stages.append(st)
+
+        top_level = st.depth == 0
+        profiler = None
+        if top_level and self.profile_dir:
+            profiler = cProfile.Profile()
+
+        if top_level:
+            self._current_fraction = 0.0
+        self._notify(st.name)
+
+        st._wall_start = time.perf_counter()
+        st._cpu_start = _tree_usage()
+        if profiler:
+            profiler.enable()
+        try:
+            yield st
+        except Exception as e:
+            st.error = str(e)
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            st.wall_seconds = time.perf_counter() - st._wall_start
+            own_cpu, child_cpu, rss = _tree_usage()
+            st.child_cpu_seconds = max(child_cpu - st._cpu_start[1], 0.0)
+            st.cpu_seconds = own_cpu - st._cpu_start[0] + st.child_cpu_seconds
+            with self._lock:
+                st.peak_rss_bytes = max(st.peak_rss_bytes, rss)
+                self._stack.remove(st)
+            if profiler:
+                st.profile_path = self._dump_profile(profiler, st.name)
+            if top_level:
+                self._done_weight += self.stage_weights.get(st.name, 0)
+                self._current_fraction = 0.0
+            logger.info(
+                f"Stage {st.name}: wall={st.wall_seconds:.2f}s cpu={st.cpu_seconds:.2f}s "
+                f"peak_rss={st.peak_rss_bytes / (1024 * 1024):.1f}MB rows {st.rows_in} -> {st.rows_out}"
+            )
+            self._notify(self._stack[0].name if self._stack else st.name)
+
+    def advance(self, fraction):
+        """Report partial completion (0..1) of the current top-level stage."""
+        self._current_fraction = min(max(fraction, 0.0), 1.0)
+        if self._stack:
+            self._notify(self._stack[-1].name)
+
+    def skip(self, name):
+        """Count a top-level stage that will not run this time as done, so progress still reaches 100%."""
+        self._done_weight += self.stage_weights.get(name, 0)
+
+    def _dump_profile(self, profiler, stage_name):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{self.run_id}_{stage_name}.prof")
+            profiler.dump_stats(path)
+            logger.info(f"cProfile for stage {stage_name} written to {path}")
+            return path
+        except Exception as e:
+            logger.error(f"Failed to dump cProfile for stage {stage_name}: {e}")
+            return None
+
+    # ---- progress / report ----------------------------------------------
+
+    def progress(self, current_stage=None):
+        elapsed = time.perf_counter() - self._start if self._start else 0.0
+        current_weight = 0.0
+        if self._stack:
+            current_weight = self.stage_weights.get(self._stack[0].name, 0) * self._current_fraction
+        fraction = min((self._done_weight + current_weight) / self.total_weight, 1.0)
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+        return {
+            'current_stage': current_stage,
+            'percent': round(fraction * 100, 1),
+            'elapsed_seconds': round(elapsed, 1),
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+        }
+
+    def _notify(self, current_stage):
+        if not self.on_progress:
+            return
+        try:
+            self.on_progress(self.progress(current_stage))
+        except Exception as e:
+            # Progress reporting must never break the pipeline
+            logger.warning(f"Progress callback failed: {e}")
+
+    def report(self):
+        total = time.perf_counter() - self._start if self._start else None
+        return {
+            'run_id': self.run_id,
+            'total_wall_seconds': round(total, 4) if total is not None else None,
+            'stages': [st.to_dict() for st in self.stages],
+            'notes': [
+                "cpu_seconds and peak_rss_mb include worker processes (child_cpu_seconds is their share); "
+                "RSS is summed per process, so pages shared with workers count more than once.",
+                "cProfile (.prof) covers the main process only: parallel stages mostly show joblib "
+                "waiting on its workers.",
+            ],
+        }
+
+
+@contextmanager
+def activate(profiler):
+    """Make `profiler` the target of module-level `stage()` / `advance()` calls."""
+    global _active
+    previous = _active
+    _active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = previous
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Time a block under the active profiler; a no-op when none is active."""
+    if _active is None:
+        yield _NullStage()
+        return
+    with _active.stage(name, rows_in=rows_in) as st:
+        yield st
+
+
+def advance(fraction):
+    if _active is not None:
+        _active.advance(fraction)
+
+
+def skip(name):
+    if _active is not None:
+        _active.skip(name)
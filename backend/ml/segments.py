@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from django.conf import settings
+from .model_registry import save_model, load_model, deactivate, current_entries
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_CHANNEL_PREFIX = 'segment:'
+
+
+def segment_channel(neighbourhood):
+    return f"{SEGMENT_CHANNEL_PREFIX}{neighbourhood}"
+
+
+def _fit_segment(base_model, X_train, y_train, X_test, y_test, global_pred):
+    """Refit the global model's family and hyper-parameters on one segment."""
+    model = clone(base_model)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)  # segments already run in parallel
+    model.fit(X_train, y_train)
+    return model, {
+        'f1': float(f1_score(y_test, model.predict(X_test), zero_division=0)),
+        'global_f1': float(f1_score(y_test, global_pred, zero_division=0)),
+        'train_rows': len(X_train),
+        'test_rows': len(X_test),
+    }
+
+
+def train_segment_models(data, base_model, neighbourhoods, parent_version, min_rows=None, n_jobs=None):
+    """
+    Train one model per neighbourhood with at least `min_rows` rows, in parallel.
+
+    Segments reuse the global preprocessing (`parent_version`) and the global
+    best model's family and hyper-parameters, and the TrainingMatrix `data`'s
+    train/test split, so `global_f1` is measured on rows the global model never
+    saw. A segment model is only activated if it beats the global model on its
+    segment's test rows; every other segment falls back to the global model.
+    Returns {neighbourhood: version} of the activated segment models.
+    """
+    min_rows = min_rows if min_rows is not None else settings.SEGMENT_MIN_ROWS
+    n_jobs = n_jobs if n_jobs is not None else settings.SEGMENT_TRAINING_JOBS
+
+    # SMOTE interpolates the label-encoded Neighbourhood; snap synthetic rows to the nearest code
+    codes = np.rint(data.column('Neighbourhood')).astype(int)
+    y_values = data.y
+    in_test = data.is_test
+    global_pred = np.empty(len(data), dtype=y_values.dtype)
+    global_pred[data.test] = base_model.predict(data.frame(data.test))
+
+    jobs = []
+    for code in np.unique(codes):
+        rows = codes == code
+        train_rows = np.flatnonzero(rows & ~in_test)
+        test_rows = np.flatnonzero(rows & in_test)
+        if rows.sum() < min_rows or len(np.unique(y_values[train_rows])) < 2 or len(test_rows) == 0:
+            continue
+        jobs.append((neighbourhoods[code], train_rows, test_rows))
+    logger.info(f"Training {len(jobs)} segment models (min_rows={min_rows}, n_jobs={n_jobs})")
+
+    with profiling.stage("fit", rows_in=len(data)) as st:
+        fitted = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_segment)(
+                base_model,
+                data.frame(train_rows), y_values[train_rows],
+                data.frame(test_rows), y_values[test_rows],
+                global_pred[test_rows],
+            )
+            for _, train_rows, test_rows in jobs
+        )
+        st.rows_out = len(fitted)
+
+    activated = {}
+    with profiling.stage("save_model"):
+        for (neighbourhood, _, _), (model, metrics) in zip(jobs, fitted):
+            if metrics['f1'] <= metrics['global_f1']:
+                logger.info(f"Segment {neighbourhood}: F1 {metrics['f1']:.3f} <= global {metrics['global_f1']:.3f}, using global model")
+                continue
+            activated[neighbourhood] = save_model(
+                model, type(model).__name__,
+                metrics=metrics,
+                feature_order=data.feature_names,
+                channel=segment_channel(neighbourhood),
+                parent=parent_version,
+            )
+        # Segments that were not (re)trained this time must not keep serving a stale model
+        for channel in current_entries(SEGMENT_CHANNEL_PREFIX):
+            if channel[len(SEGMENT_CHANNEL_PREFIX):] not in activated:
+                deactivate(channel)
+
+    logger.info(f"Activated {len(activated)} of {len(jobs)} segment models")
+    return activated
+
+
+def current_segments(parent_version):
+    """{neighbourhood: version} of active segment models built on `parent_version`'s preprocessing."""
+    return {
+        channel[len(SEGMENT_CHANNEL_PREFIX):]: entry['version']
+        for channel, entry in current_entries(SEGMENT_CHANNEL_PREFIX).items()
+        if entry.get('parent') == parent_version
+    }
+
+
+class SegmentModelCache:
+    """
+    Bounded LRU of loaded segment models. Models are loaded lazily on first
+    use (one load per segment even under concurrent requests) and the least
+    recently used one is evicted when `capacity` is exceeded. A segment whose
+    model fails to load is skipped (served by the global model) until the
+    next reload.
+    """
+
+    def __init__(self, segments, capacity):
+        self.segments = dict(segments)
+        self.capacity = capacity
+        self._models = OrderedDict()
+        self._explainers = {}
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._failed = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_errors = 0
+        self.load_count = 0
+        self.load_seconds_total = 0.0
+        self.load_seconds_max = 0.0
+
+    def get(self, neighbourhood):
+        """Model for `neighbourhood`, or None if it has no (loadable) segment model."""
+        version = self.segments.get(neighbourhood)
+        if version is None or neighbourhood in self._failed:
+            return None
+        with self._lock:
+            model = self._models.get(neighbourhood)
+            if model is not None:
+                self._models.move_to_end(neighbourhood)
+                self.hits += 1
+                return model
+            self.misses += 1
+            load_lock = self._loading.setdefault(neighbourhood, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._models.get(neighbourhood)
+            if model is not None:
+                return model  # loaded by a concurrent request
+            started = time.perf_counter()
+            try:
+                model = load_model(version)
+            except Exception as e:
+                logger.error(f"Failed to load segment model {neighbourhood} ({version}): {e}")
+                model = None
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                if model is None:
+                    self._failed.add(neighbourhood)
+                    self.load_errors += 1
+                    return None
+                self.load_count += 1
+                self.load_seconds_total += elapsed
+                self.load_seconds_max = max(self.load_seconds_max, elapsed)
+                self._models[neighbourhood] = model
+                while len(self._models) > self.capacity:
+                    evicted, _ = self._models.popitem(last=False)
+                    self._explainers.pop(evicted, None)
+                    self.evictions += 1
+                    logger.debug(f"Evicted segment model {evicted}")
+            return model
+
+    def explainer(self, neighbourhood, build):
+        """Explainer for a loaded segment model, built with `build(model)` on first use and evicted with it."""
+        model = self.get(neighbourhood)
+        if model is None:
+            return None
+        with self._lock:
+            explainer = self._explainers.get(neighbourhood)
+        if explainer is None:
+            explainer = build(model)
+            with self._lock:
+                if neighbourhood in self._models:
+                    self._explainers[neighbourhood] = explainer
+        return explainer
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'segments': len(self.segments),
+                'capacity': self.capacity,
+                'loaded': list(self._models),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else None,
+                'evictions': self.evictions,
+                'load_errors': self.load_errors,
+                'loads': self.load_count,
+                'load_seconds_mean': self.load_seconds_total / self.load_count if self.load_count else None,
+                'load_seconds_max': self.load_seconds_max,
+            }
@@ -0,0 +1,230 @@
+import datetime
+import logging
+import queue
+import random
+import threading
+import time
+import numpy as np
+import pandas as pd
+from db.mongo import get_collection
+
+logger = logging.getLogger(__name__)
+
+
+class _Comparison:
+    """Running champion vs challenger counters for one challenger version."""
+
+    def __init__(self):
+        self.rows = 0
+        self.agreements = 0
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.delta_sq_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.batches = 0
+        self.errors = 0
+        self.score_seconds = 0.0
+
+    def update(self, delta, agreements, seconds):
+        self.rows += len(delta)
+        self.agreements += agreements
+        self.delta_sum += float(delta.sum())
+        self.abs_delta_sum += float(np.abs(delta).sum())
+        self.delta_sq_sum += float((delta ** 2).sum())
+        self.max_abs_delta = max(self.max_abs_delta, float(np.abs(delta).max()))
+        self.batches += 1
+        self.score_seconds += seconds
+
+
+def summarize(counts):
+    """Agreement rate and P(show) delta statistics from raw comparison counters."""
+    rows = counts.get('rows', 0)
+    if not rows:
+        return {'rows': 0, 'agreement_rate': None, 'mean_delta': None, 'mean_abs_delta': None,
+                'delta_std': None, 'max_abs_delta': None}
+    mean = counts['delta_sum'] / rows
+    return {
+        'rows': rows,
+        'agreement_rate': counts['agreements'] / rows,
+        'mean_delta': mean,
+        'mean_abs_delta': counts['abs_delta_sum'] / rows,
+        'delta_std': max(counts['delta_sq_sum'] / rows - mean ** 2, 0.0) ** 0.5,
+        'max_abs_delta': counts['max_abs_delta'],
+    }
+
+
+class ShadowScorer:
+    """
+    Champion/challenger shadow scoring, off the request path.
+
+    The serving predictor (the champion) hands every scored batch to `submit`,
+    which only does a non-blocking put on a queue bounded in rows. A small pool of
+    worker threads drains the queue, concatenates submissions into batches
+    of up to `batch_size` rows and scores them with every challenger: a
+    predictor.LoadedModel of another registry version, so each challenger
+    applies its own preprocessing artifacts to the same raw inputs.
+
+    Per challenger it records the agreement rate (same will_show decision)
+    and the P(show) deltas (challenger - champion), in memory and as $inc
+    counters in `collection_name`, so the numbers add up across API workers.
+
+    Load shedding: submissions are sampled with `sample_rate`, and when the
+    workers fall behind and a submission would take the queue past
+    `queue_rows` rows it is dropped and counted instead of queued. The bound
+    is in rows because a forecast submission can hold thousands of them.
+    Nothing here can slow down or fail a prediction.
+    """
+
+    def __init__(self, champion_version, challengers, queue_rows=50000, batch_size=256, workers=1,
+                 sample_rate=1.0, flush_interval=1.0, collection_name="shadow_evaluation"):
+        self.champion_version = champion_version
+        self.challengers = dict(challengers)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.collection_name = collection_name
+        self.queue_rows = queue_rows
+        self._queue = queue.Queue()
+        self._queued_rows = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "sampled_out": 0, "shed": 0, "scored_rows": 0, "batches": 0}
+        self._comparisons = {version: _Comparison() for version in self.challengers}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def submit(self, data, proba_show):
+        """
+        Queue raw inputs (list of dicts or DataFrame) and the champion's
+        P(show) for shadow scoring. Never blocks; returns False if the
+        submission was sampled out or shed.
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count("sampled_out")
+            return False
+        self._ensure_started()
+        rows = len(proba_show)
+        with self._lock:
+            if self._queued_rows + rows > self.queue_rows:
+                self.stats["shed"] += 1
+                return False
+            self._queued_rows += rows
+            self.stats["submitted"] += 1
+        self._queue.put_nowait((data, proba_show))
+        return True
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                self._threads = [
+                    threading.Thread(target=self._run, name=f"shadow-scorer-{i}", daemon=True)
+                    for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._score(batch)
+
+    def _collect_batch(self):
+        batch, rows = [], 0
+        deadline = time.monotonic() + self.flush_interval
+        while rows < self.batch_size and not self._stop.is_set():
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=min(timeout, 0.5))
+            except queue.Empty:
+                continue
+            batch.append(item)
+            rows += len(item[1])
+            with self._lock:
+                self._queued_rows -= len(item[1])
+        return batch
+
+    def _score(self, batch):
+        frames = [data if isinstance(data, pd.DataFrame) else pd.DataFrame(data) for data, _ in batch]
+        raw = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+        champion = np.concatenate([np.asarray(proba, dtype=np.float64) for _, proba in batch])
+        self._count("batches")
+        self._count("scored_rows", len(raw))
+        for version, challenger in self.challengers.items():
+            started = time.perf_counter()
+            try:
+                proba = challenger.predict_proba_show(*challenger.prepare_features(raw))
+            except Exception as e:
+                with self._lock:
+                    self._comparisons[version].errors += 1
+                logger.warning(f"Shadow scoring with challenger {version} failed: {e}")
+                continue
+            delta = np.asarray(proba, dtype=np.float64) - champion
+            agreements = int(((proba >= 0.5) == (champion >= 0.5)).sum())
+            with self._lock:
+                self._comparisons[version].update(delta, agreements, time.perf_counter() - started)
+            self._persist(version, delta, agreements)
+
+    def _persist(self, version, delta, agreements):
+        try:
+            get_collection(self.collection_name).update_one(
+                {"_id": f"{self.champion_version}|{version}"},
+                {
+                    "$set": {
+                        "champion_version": self.champion_version,
+                        "challenger_version": version,
+                        "updated_at": datetime.datetime.now(datetime.timezone.utc),
+                    },
+                    "$inc": {
+                        "rows": len(delta),
+                        "agreements": agreements,
+                        "delta_sum": float(delta.sum()),
+                        "abs_delta_sum": float(np.abs(delta).sum()),
+                        "delta_sq_sum": float((delta ** 2).sum()),
+                    },
+                    "$max": {"max_abs_delta": float(np.abs(delta).max())},
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to persist shadow comparison for {version}: {e}")
+
+    def report(self):
+        """Queue counters and per-challenger comparison for this process."""
+        with self._lock:
+            versions = {}
+            for version, c in self._comparisons.items():
+                versions[version] = summarize(vars(c))
+                versions[version].update({
+                    'batches': c.batches,
+                    'errors': c.errors,
+                    'score_ms_per_batch': c.score_seconds * 1000 / c.batches if c.batches else None,
+                })
+            return {
+                'champion_version': self.champion_version,
+                'queue_depth': self._queue.qsize(),
+                'queued_rows': self._queued_rows,
+                **self.stats,
+                'challengers': versions,
+            }
+
+    def close(self, timeout=5):
+        """Stop the workers; anything still queued is discarded (shadow results are best effort)."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+
+def persisted_comparisons(champion_version):
+    """Comparisons summed over every API worker, from `shadow_evaluation`."""
+    docs = get_collection("shadow_evaluation").find({"champion_version": champion_version})
+    return {doc['challenger_version']: summarize(doc) for doc in docs}
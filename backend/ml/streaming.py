@@ -0,0 +1,326 @@
+import logging
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from django.conf import settings
+from db.mongo import get_collection
+from .data_loader import iter_chunks
+from .evaluation import metrics_from_confusion, bootstrap_intervals
+from .feature_engineering import REFERENCE_SAMPLE_SIZE
+from .predictor import FEATURE_ORDER, SCALE_COLS
+from .drift import build_reference, save_reference
+from .model_registry import save_model
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+# Out-of-core counterpart of clean_data + FeatureEngineer + train_models for
+# datasets larger than RAM. The CSV is read in chunks several times:
+#
+#   1. profile:    fill values, Age IQR bounds and neighbourhood classes
+#                  (exact, from value counts)
+#   2. transforms: StandardScaler.partial_fit on the cleaned chunks, class
+#                  counts, a bounded drift-reference sample
+#   3. epochs:     partial_fit of every candidate on the training rows
+#   4. evaluate:   confusion counts on the holdout rows
+#
+# Only one chunk (plus the bounded reference sample) is in memory at a time.
+# Differences from the in-memory pipeline: duplicates are dropped per chunk,
+# rows with missing dates are dropped instead of mode-filled, and class
+# imbalance is handled with balanced sample weights instead of SMOTE.
+
+ID_COLUMNS = ['PatientId', 'AppointmentID']
+DATE_COLUMNS = ['ScheduledDay', 'AppointmentDay']
+TARGET = 'No-show'
+HASH_BUCKETS = 10000
+
+
+def _candidates():
+    """Estimators that support partial_fit and predict_proba, trained side by side."""
+    return {
+        'SGDLogisticRegression': SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42),
+        'SGDLogisticRegressionStrongL2': SGDClassifier(loss='log_loss', alpha=1e-3, random_state=42),
+        'SGDModifiedHuber': SGDClassifier(loss='modified_huber', alpha=1e-4, random_state=42),
+    }
+
+
+def _quantile_from_counts(counts, q):
+    """pandas-style (linear) quantile of the values described by a value-counts Series."""
+    counts = counts.sort_index()
+    values = counts.index.to_numpy(dtype=np.float64)
+    cumulative = np.cumsum(counts.to_numpy())
+    position = q * (cumulative[-1] - 1)
+    lo = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    hi = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    return lo + (hi - lo) * (position - np.floor(position))
+
+
+def _profile(csv_path, chunksize):
+    """Pass 1: the statistics clean_data / FeatureEngineer compute on the full frame."""
+    counts = {}
+    rows = 0
+    for chunk in iter_chunks(csv_path, chunksize):
+        chunk = chunk.drop_duplicates()
+        rows += len(chunk)
+        for col in chunk.columns:
+            if col in ID_COLUMNS or col in DATE_COLUMNS:
+                continue
+            vc = chunk[col].value_counts()
+            counts[col] = vc if col not in counts else counts[col].add(vc, fill_value=0)
+    if not rows:
+        raise ValueError("Dataset is empty")
+
+    fill_values = {}
+    for col, vc in counts.items():
+        if pd.api.types.is_numeric_dtype(vc.index):
+            fill_values[col] = _quantile_from_counts(vc, 0.5)
+        else:
+            fill_values[col] = vc.sort_index().idxmax()  # mode (smallest value on ties, like pandas)
+
+    # Age as clean_data sees it: median-filled, 0-120, then the IQR filter
+    ages = counts['Age'].copy()
+    missing = rows - ages.sum()
+    if missing:
+        ages.loc[fill_values['Age']] = ages.get(fill_values['Age'], 0) + missing
+    ages = ages[(ages.index >= 0) & (ages.index <= 120)]
+    q1, q3 = _quantile_from_counts(ages, 0.25), _quantile_from_counts(ages, 0.75)
+    iqr = q3 - q1
+
+    return {
+        'rows': rows,
+        'fill_values': fill_values,
+        'age_bounds': (q1 - 1.5 * iqr, q3 + 1.5 * iqr),
+        'neighbourhoods': np.array(sorted(counts['Neighbourhood'].index), dtype=object),
+    }
+
+
+def _clean_chunk(chunk, params):
+    chunk = chunk.drop_duplicates()
+    chunk = chunk.fillna(params['fill_values']).dropna(subset=DATE_COLUMNS)
+    lower, upper = params['age_bounds']
+    age = chunk['Age']
+    return chunk[(age >= 0) & (age <= 120) & (age >= lower) & (age <= upper)]
+
+
+def _holdout_mask(chunk, fraction):
+    """Deterministic per-row holdout split (same rows in every pass), keyed on AppointmentID."""
+    key = chunk['AppointmentID'] if 'AppointmentID' in chunk.columns else chunk
+    hashes = pd.util.hash_pandas_object(key, index=False).to_numpy()
+    return (hashes % HASH_BUCKETS) < fraction * HASH_BUCKETS
+
+
+def _engineer_chunk(chunk, neighbourhood_encoder):
+    """FeatureEngineer.process steps 1-3 with already fitted encoders (no scaling yet)."""
+    scheduled = pd.to_datetime(chunk['ScheduledDay']).dt.normalize()
+    appointment = pd.to_datetime(chunk['AppointmentDay']).dt.normalize()
+    X = pd.DataFrame(index=chunk.index)
+    for col in FEATURE_ORDER:
+        if col in chunk.columns:
+            X[col] = chunk[col]
+    X['Gender'] = chunk['Gender'].map({'F': 0, 'M': 1})
+    X['Neighbourhood'] = np.searchsorted(neighbourhood_encoder.classes_, chunk['Neighbourhood'].to_numpy(dtype=object))
+    X['waiting_time'] = (appointment - scheduled).dt.days.clip(lower=0)
+    X['appointment_day_of_week'] = appointment.dt.dayofweek
+    y = chunk[TARGET].map({'Yes': 1, 'No': 0}).to_numpy()
+    return X[FEATURE_ORDER], y
+
+
+class _Stream:
+    """Cleaned, engineered and scaled chunks with their holdout mask."""
+
+    def __init__(self, csv_path, chunksize, params, neighbourhood_encoder, holdout_fraction):
+        self.csv_path = csv_path
+        self.chunksize = chunksize
+        self.params = params
+        self.neighbourhood_encoder = neighbourhood_encoder
+        self.holdout_fraction = holdout_fraction
+        self.scaler = None
+
+    def raw(self):
+        """(cleaned chunk, unscaled X, y, holdout mask) per chunk."""
+        for chunk in iter_chunks(self.csv_path, self.chunksize):
+            chunk = _clean_chunk(chunk, self.params)
+            if chunk.empty:
+                continue
+            X, y = _engineer_chunk(chunk, self.neighbourhood_encoder)
+            yield chunk, X, y, _holdout_mask(chunk, self.holdout_fraction)
+
+    def __iter__(self):
+        for _, X, y, holdout in self.raw():
+            X[SCALE_COLS] = self.scaler.transform(X[SCALE_COLS])
+            yield X, y, holdout
+
+
+def _fit_transforms(stream, params):
+    """
+    Pass 2: fit the scaler incrementally, count classes and neighbourhood codes,
+    keep a bounded reference sample, and persist the cleaned chunks.
+    Also returns per-feature centering / scaling of the model input, used to
+    condition SGD (folded back into the coefficients after training).
+    """
+    scaler = StandardScaler()
+    input_scaler = StandardScaler()
+    class_counts = np.zeros(2, dtype=np.int64)
+    code_counts = np.zeros(len(stream.neighbourhood_encoder.classes_), dtype=np.int64)
+    sample_fraction = min(1.0, REFERENCE_SAMPLE_SIZE / params['rows'])
+    samples_X, samples_y = [], []
+    rows = 0
+
+    cleaned_col = get_collection("cleaned_data")
+    try:
+        cleaned_col.delete_many({})
+    except Exception as e:
+        logger.error(f"Failed to reset cleaned data: {e}")
+
+    for chunk, X, y, holdout in stream.raw():
+        scaler.partial_fit(X[SCALE_COLS])
+        input_scaler.partial_fit(X)
+        class_counts += np.bincount(y[~holdout], minlength=2)
+        code_counts += np.bincount(X['Neighbourhood'].to_numpy(), minlength=len(code_counts))
+        sample = X.sample(frac=sample_fraction, random_state=42)
+        samples_X.append(sample)
+        samples_y.append(pd.Series(y, index=X.index).loc[sample.index])
+        rows += len(X)
+        try:
+            cleaned_col.insert_many(chunk.to_dict(orient='records'))
+        except Exception as e:
+            logger.error(f"Failed to persist cleaned chunk: {e}")
+        profiling.advance(rows / params['rows'])
+
+    if not rows:
+        raise ValueError("No rows left after cleaning")
+    stream.scaler = scaler
+
+    reference_X = pd.concat(samples_X)
+    reference_X[SCALE_COLS] = scaler.transform(reference_X[SCALE_COLS])
+    reference_y = pd.concat(samples_y)
+
+    # Model input = X with SCALE_COLS already standardized; the rest is raw
+    center = pd.Series(input_scaler.mean_, index=FEATURE_ORDER)
+    spread = pd.Series(input_scaler.scale_, index=FEATURE_ORDER)
+    center[SCALE_COLS], spread[SCALE_COLS] = 0.0, 1.0
+
+    logger.info(f"Transforms fitted on {rows} rows; training class counts {class_counts.tolist()}")
+    return {
+        'rows': rows,
+        'class_counts': class_counts,
+        'neighbourhood_mode': int(np.argmax(code_counts)),
+        'reference_X': reference_X,
+        'reference_y': reference_y,
+        'center': center.to_numpy(),
+        'spread': spread.to_numpy(),
+    }
+
+
+def _fold_standardization(model, center, spread):
+    """Rewrite a linear model trained on (x - center) / spread to work on x directly."""
+    coef = model.coef_ / spread
+    model.intercept_ = model.intercept_ - coef @ center
+    model.coef_ = coef
+    model.feature_names_in_ = np.array(FEATURE_ORDER, dtype=object)
+    return model
+
+
+def train_out_of_core(csv_path=None, chunksize=None, epochs=None, holdout_fraction=None):
+    """
+    Run the whole training pipeline with memory bounded by the chunk size and
+    save the best model as a new registry version. Returns the best model.
+    """
+    chunksize = chunksize or settings.TRAINING_CHUNK_SIZE
+    epochs = epochs or settings.STREAMING_EPOCHS
+    holdout_fraction = holdout_fraction or settings.STREAMING_HOLDOUT_FRACTION
+
+    # 1. Profile (statistics for cleaning and encoding)
+    with profiling.stage("load") as st:
+        params = _profile(csv_path, chunksize)
+        neighbourhood_encoder = LabelEncoder().fit(params['neighbourhoods'])
+        st.rows_out = params['rows']
+    profiling.skip("clean")  # cleaning happens per chunk in the passes below
+
+    # 2. Fit the feature transforms
+    stream = _Stream(csv_path, chunksize, params, neighbourhood_encoder, holdout_fraction)
+    with profiling.stage("feature_engineering", rows_in=params['rows']) as st:
+        fitted = _fit_transforms(stream, params)
+        st.rows_out = fitted['rows']
+
+    class_counts = fitted['class_counts']
+    class_weight = class_counts.sum() / (2.0 * np.maximum(class_counts, 1))  # 'balanced'
+    center, spread = fitted['center'], fitted['spread']
+    models = _candidates()
+    rng = np.random.default_rng(42)
+    passes = epochs + 1
+
+    with profiling.stage("train", rows_in=fitted['rows']) as st:
+        # 3. Epochs of partial_fit on the training rows (shuffled within each chunk)
+        for epoch in range(epochs):
+            with profiling.stage(f"epoch_{epoch + 1}"):
+                seen = 0
+                for X, y, holdout in stream:
+                    train = np.flatnonzero(~holdout)
+                    train = train[rng.permutation(len(train))]
+                    Z = (X.to_numpy(dtype=np.float64)[train] - center) / spread
+                    weights = class_weight[y[train]]
+                    for model in models.values():
+                        model.partial_fit(Z, y[train], classes=[0, 1], sample_weight=weights)
+                    seen += len(X)
+                    profiling.advance((epoch + seen / fitted['rows']) / passes)
+
+        # 4. Streamed holdout evaluation with incremental confusion counts
+        with profiling.stage("evaluate"):
+            confusion = {name: np.zeros(4, dtype=np.int64) for name in models}
+            for X, y, holdout in stream:
+                Z = (X.to_numpy(dtype=np.float64)[holdout] - center) / spread
+                for name, model in models.items():
+                    confusion[name] += np.bincount(2 * y[holdout] + model.predict(Z), minlength=4)
+            profiling.advance(1.0)
+
+        results = {}
+        for name, counts in confusion.items():
+            tn, fp, fn, tp = (int(c) for c in counts)
+            metrics = metrics_from_confusion(tn, fp, fn, tp)
+            metrics['holdout_rows'] = tn + fp + fn + tp
+            results[name] = {
+                'metrics': metrics,
+                'confusion_matrix': [[tn, fp], [fn, tp]],
+                # Holdout scores are not kept, so no threshold sweep / AUC here
+                'confidence_intervals': bootstrap_intervals([tn, fp, fn, tp]),
+            }
+            logger.info(f"{name} Results: {metrics}")
+        best_model_name = max(results, key=lambda name: results[name]['metrics']['f1'])
+        best_model = _fold_standardization(models[best_model_name], center, spread)
+        logger.info(f"Best Model: {best_model_name} with F1: {results[best_model_name]['metrics']['f1']}")
+
+        with profiling.stage("persist_mongo"):
+            try:
+                col = get_collection("model_evaluation")
+                col.delete_many({})
+                col.insert_one({"results": results, "best_model": best_model_name, "training_mode": "streaming"})
+                db_features = get_collection("engineered_features_metadata")
+                db_features.delete_many({})
+                db_features.insert_one({
+                    "feature_names": FEATURE_ORDER,
+                    "shape": [fitted['rows'], len(FEATURE_ORDER)],
+                    "target_distribution": {str(k): int(v) for k, v in enumerate(class_counts)},
+                })
+            except Exception as e:
+                logger.error(f"Failed to save evaluation to Mongo: {e}")
+
+        with profiling.stage("drift_reference", rows_in=len(fitted['reference_X'])):
+            reference = build_reference(fitted['reference_X'], best_model, fitted['reference_y'])
+            save_reference(reference)
+
+        with profiling.stage("save_model"):
+            save_model(
+                best_model, best_model_name,
+                artifacts={
+                    'scaler': stream.scaler,
+                    'neighbourhood_encoder': neighbourhood_encoder,
+                    'neighbourhood_mode': fitted['neighbourhood_mode'],
+                    'drift_reference': reference,
+                },
+                metrics=results[best_model_name]['metrics'],
+                feature_order=FEATURE_ORDER,
+            )
+        st.rows_out = fitted['rows']
+    return best_model
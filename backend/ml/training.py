@@ -4,21 +4,32 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import GridSearchCV, train_test_split, cross_val_score
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.metrics import accuracy_score, classification_report
 import logging
 import pickle
 from django.conf import settings
 from db.mongo import get_collection
-from .evaluation import evaluate_model
+from .evaluation import evaluate_predictions
 from .model_registry import save_model
+from .drift import build_reference, save_reference
+from . import profiling
 
 logger = logging.getLogger(__name__)
 
-def train_models(X, y):
+def train_models(data, artifacts=None, reference=None):
+    """
+    Grid-search every model family on a TrainingMatrix, store the evaluation
+    and save the best model as a new registry version together with
+    `artifacts` (the fitted preprocessing objects). If `reference` =
+    (X_ref, y_ref) is given, the drift reference is computed for the best
+    model and saved with it.
+    """
     logger.info("Starting model training...")
     
-    # Split
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Split: views of the matrix, and the same 5 CV folds for every grid search
+    X_train, y_train = data.frame(data.train), data.y[data.train]
+    X_test, y_test = data.frame(data.test), data.y[data.test]
+    folds = data.cv_folds(5)
     
     models_config = {
         'LogisticRegression': {
@@ -51,25 +62,26 @@ def train_models(X, y):
     
     results = {}
     
-    for name, config in models_config.items():
+    for i, (name, config) in enumerate(models_config.items()):
         logger.info(f"Training {name} with GridSearchCV...")
-        grid = GridSearchCV(config['model'], config['params'], cv=5, scoring='f1', n_jobs=-1)
-        grid.fit(X_train, y_train)
-        
-        best_clf = grid.best_estimator_
-        y_pred = best_clf.predict(X_test)
+        with profiling.stage(name, rows_in=len(X_train)) as st:
+            grid = GridSearchCV(config['model'], config['params'], cv=folds, scoring='f1', n_jobs=-1)
+            grid.fit(X_train, y_train)
+            
+            best_clf = grid.best_estimator_
+            y_pred = best_clf.predict(X_test)
+            scores = best_clf.predict_proba(X_test)[:, list(best_clf.classes_).index(1)]
+            st.rows_out = len(y_pred)
+        profiling.advance((i + 1) / len(models_config))
         
-        # Evaluate
-        metrics = evaluate_model(y_test, y_pred)
+        # Evaluate: metrics, confusion matrix, threshold sweep and bootstrap CIs in one go
+        with profiling.stage(f"{name}_evaluate", rows_in=len(y_pred)):
+            report = evaluate_predictions(y_test, y_pred, scores)
+        metrics = report['metrics']
         metrics['best_params'] = grid.best_params_
         metrics['cv_score'] = grid.best_score_
         
-        conf_matrix = confusion_matrix(y_test, y_pred).tolist()
-        
-        results[name] = {
-            'metrics': metrics,
-            'confusion_matrix': conf_matrix
-        }
+        results[name] = report
         
         logger.info(f"{name} Results: {metrics}")
         
@@ -79,19 +91,34 @@ def train_models(X, y):
             best_model_name = name
             
     # Save results to Mongo
-    try:
-        col = get_collection("model_evaluation")
-        col.delete_many({}) # simple overwrite for this task
-        col.insert_one({
-            "results": results,
-            "best_model": best_model_name
-        })
-    except Exception as e:
-        logger.error(f"Failed to save evaluation to Mongo: {e}")
+    with profiling.stage("persist_mongo"):
+        try:
+            col = get_collection("model_evaluation")
+            col.delete_many({}) # simple overwrite for this task
+            col.insert_one({
+                "results": results,
+                "best_model": best_model_name
+            })
+        except Exception as e:
+            logger.error(f"Failed to save evaluation to Mongo: {e}")
         
     logger.info(f"Best Model: {best_model_name} with F1: {best_overall_score}")
     
+    artifacts = dict(artifacts or {})
+    if reference is not None:
+        X_ref, y_ref = reference
+        with profiling.stage("drift_reference", rows_in=len(X_ref)) as st:
+            artifacts['drift_reference'] = build_reference(X_ref, best_overall_model, y_ref)
+            save_reference(artifacts['drift_reference'])
+            st.rows_out = len(X_ref)
+
     # Save Best Model
-    save_model(best_overall_model, best_model_name)
+    with profiling.stage("save_model"):
+        save_model(
+            best_overall_model, best_model_name,
+            artifacts=artifacts,
+            metrics=results[best_model_name]['metrics'],
+            feature_order=data.feature_names,
+        )
     
     return best_overall_model
@@ -0,0 +1,81 @@
+import logging
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+logger = logging.getLogger(__name__)
+
+
+class TrainingMatrix:
+    """
+    Engineered features as one C-contiguous float32 array plus int8 labels,
+    with the rows stored in train/test split order.
+
+    - The train and test sets are slices, i.e. views: splitting copies nothing.
+    - `frame()` wraps a slice in a DataFrame without copying (single float32
+      block), so estimators still see the feature names they are served with.
+    - float32 is what the tree models (DecisionTree, RandomForest) convert to
+      internally, so they fit on the array as-is instead of making a float32
+      copy of every fold. LogisticRegression upcasts to float64 itself
+      (liblinear always, lbfgs per fold), as it did on the old float64 frame.
+    - Binary flags stay float32 columns: sklearn converts X to one dtype, so
+      int8 feature columns would only be upcast again. The labels are int8.
+
+    CV folds are index arrays into the training rows, computed once and
+    shared by every grid search.
+    """
+
+    def __init__(self, X, y, feature_names, n_train):
+        self.X = X
+        self.y = y
+        self.feature_names = list(feature_names)
+        self.n_train = n_train
+
+    @classmethod
+    def from_frame(cls, X, y, test_size=0.2, random_state=42):
+        """
+        Build from FeatureEngineer output. The split is the same permutation
+        train_test_split(X, y, test_size, random_state) would produce. Columns
+        are converted one at a time, so there is never a second full float64 copy.
+        """
+        train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=test_size, random_state=random_state)
+        order = np.concatenate([train_idx, test_idx])
+        values = np.empty((len(X), X.shape[1]), dtype=np.float32)
+        for j, column in enumerate(X.columns):
+            values[:, j] = X[column].to_numpy()[order]
+        labels = np.asarray(y)[order].astype(np.int8)
+        logger.info(f"Training matrix: {values.shape} float32 ({values.nbytes / 2**20:.1f} MB), {len(train_idx)} train rows")
+        return cls(values, labels, X.columns, len(train_idx))
+
+    def __len__(self):
+        return len(self.X)
+
+    @property
+    def train(self):
+        return slice(0, self.n_train)
+
+    @property
+    def test(self):
+        return slice(self.n_train, len(self.X))
+
+    @property
+    def is_test(self):
+        """Boolean mask of the test rows."""
+        mask = np.zeros(len(self.X), dtype=bool)
+        mask[self.test] = True
+        return mask
+
+    def frame(self, rows=slice(None)):
+        """Feature DataFrame over `rows`; a view when `rows` is a slice."""
+        return pd.DataFrame(self.X[rows], columns=self.feature_names, copy=False)
+
+    def column(self, name):
+        return self.X[:, self.feature_names.index(name)]
+
+    def cv_folds(self, n_splits=5):
+        """
+        (train, validation) index arrays into the training rows, the same
+        folds GridSearchCV(cv=n_splits) builds for a classifier.
+        """
+        y_train = self.y[self.train]
+        return list(StratifiedKFold(n_splits=n_splits).split(np.zeros((len(y_train), 1)), y_train))